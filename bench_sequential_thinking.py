@@ -0,0 +1,106 @@
+"""sequentialthinking 도구의 단계별 지연 시간 비교
+
+프로세스 내부 구현(SequentialThinkingEngine)과 npx stdio 서버에 같은 생각 체인을 보내
+한 단계당 걸리는 시간을 비교합니다.
+
+사용법:
+    python bench_sequential_thinking.py [--steps=10] [--rounds=20] [--native-only]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from contextlib import AsyncExitStack
+from typing import List
+
+from client_config import load_config
+from sequential_thinking_engine import TOOL_NAME, SequentialThinkingEngine
+
+
+def _get_option(name: str, default: int) -> int:
+    prefix = f"--{name}="
+    for arg in sys.argv[1:]:
+        if arg.startswith(prefix):
+            return int(arg[len(prefix):])
+    return default
+
+
+def _thought_chain(steps: int) -> List[dict]:
+    """분기와 수정을 포함한 생각 체인을 만듭니다."""
+    chain = []
+    for number in range(1, steps + 1):
+        arguments = {
+            "thought": f"Step {number}: reasoning about the problem in some detail.",
+            "thoughtNumber": number,
+            "totalThoughts": steps,
+            "nextThoughtNeeded": number < steps,
+        }
+        if number == 3:
+            arguments.update({"isRevision": True, "revisesThought": 2})
+        if number == 4:
+            arguments.update({"branchFromThought": 3, "branchId": "alt"})
+        chain.append(arguments)
+    return chain
+
+
+async def run_chain(session, steps: int, rounds: int) -> List[float]:
+    """생각 체인을 rounds번 실행하고 단계별 지연 시간(초) 목록을 반환합니다."""
+    samples = []
+    for _ in range(rounds):
+        for arguments in _thought_chain(steps):
+            start_time = time.perf_counter()
+            result = await session.call_tool(TOOL_NAME, arguments)
+            samples.append(time.perf_counter() - start_time)
+            if result.isError:
+                raise RuntimeError(result.content[0].text)
+    return samples
+
+
+def report(name: str, samples: List[float]):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{name:<10} 단계 {len(samples):>5}개  "
+          f"평균 {statistics.mean(samples) * 1000:8.3f}ms  "
+          f"중앙값 {statistics.median(samples) * 1000:8.3f}ms  "
+          f"p95 {p95 * 1000:8.3f}ms")
+
+
+async def bench_native(steps: int, rounds: int) -> List[float]:
+    session = SequentialThinkingEngine().create_session()
+    return await run_chain(session, steps, rounds)
+
+
+async def bench_stdio(steps: int, rounds: int) -> List[float]:
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    server_config = load_config().servers["sequential-thinking"]
+    params = StdioServerParameters(
+        command=server_config.command,
+        args=server_config.args,
+        env=server_config.process_env()
+    )
+    async with AsyncExitStack() as stack:
+        read, write = await stack.enter_async_context(stdio_client(params))
+        session = await stack.enter_async_context(ClientSession(read, write))
+        await session.initialize()
+        return await run_chain(session, steps, rounds)
+
+
+async def main():
+    steps = _get_option("steps", 10)
+    rounds = _get_option("rounds", 20)
+    print(f"> 생각 체인 {steps}단계 x {rounds}회 실행")
+
+    report("native", await bench_native(steps, rounds))
+
+    if "--native-only" in sys.argv:
+        return
+    try:
+        report("stdio", await asyncio.wait_for(bench_stdio(steps, rounds), timeout=120))
+    except Exception as e:
+        print(f"> stdio 서버를 실행할 수 없어 비교를 건너뜁니다: {str(e) or type(e).__name__}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
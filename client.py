@@ -1,55 +1,247 @@
 import asyncio
-from typing import Optional, Dict, Any, List
-from contextlib import AsyncExitStack
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Callable
+from contextlib import AsyncExitStack, suppress
+import importlib
+import inspect
 import json
-import ollama
 import sys
 import os
+import threading
 import time
 import re
 
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+# ollama, mcp 클라이언트, dotenv, 도구 확장 모듈은 시작 시간을 줄이기 위해 처음 필요할 때 가져옵니다
+if TYPE_CHECKING:
+    from mcp import ClientSession
 
-from dotenv import load_dotenv
+from client_config import ClientConfig, ConfigError, DEFAULT_CONFIG_PATH, load_config
+from local_tools import LocalToolSession
+from result_shaping import ResultShaper, SPILL_TOOL_NAME, extract_text
+from tool_validation import ToolArgumentError, compile_validator
+from traffic_trace import (
+    RecordingOllama, RecordingSession, ReplayOllama, ReplaySession, TraceReader, TraceWriter, startup_traffic
+)
 
-# 도구별 확장 기능 모듈 가져오기
-from sequential_thinking_extension import SequentialThinkingExtension
-from perplexity_extension import PerplexityExtension
+# 후속 응답에서 잘린 결과를 이어 읽을 수 있는 최대 횟수
+MAX_SPILL_PAGES = 3
+
+DEFAULT_MODEL = "MFDoom/deepseek-r1-tool-calling:14b"
+DEFAULT_KEEP_ALIVE = "30m"  # 마지막 요청 후 모델을 메모리에 유지할 시간
+COLD_LOAD_THRESHOLD = 0.5  # 모델 로드 시간이 이보다 길면 cold 호출로 분류 (초)
+
+# 도구 호출을 시도했지만 파싱되지 않은 응답을 감지하기 위한 표시
+TOOL_CALL_MARKERS = ("[TOOL]", "<function_calls>", "<invoke", '"tool_use"', "Tool:")
+
+# 네이티브 도구 호출 사용 시 시스템 메시지 (도구 설명은 tools= 매개변수로 전달)
+NATIVE_TOOLS_SYSTEM_MESSAGE = "You are a helpful AI assistant that can use various tools to help users."
+
+def _timed_import(module_name: str, timings: List[tuple]):
+    """모듈을 가져오고, 처음 가져오는 경우 걸린 시간을 timings에 기록합니다."""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    start_time = time.perf_counter()
+    module = importlib.import_module(module_name)
+    timings.append((f"import {module_name}", time.perf_counter() - start_time))
+    return module
+
+class _AnswerStream:
+    """최종 응답일 수도 있는 모델 응답을 on_token으로 스트리밍합니다.
+
+    도구 호출 표시가 시작될 수 있는 부분부터는 보내지 않고 모아 두었다가 finish()에서 보냅니다.
+    응답이 도구 호출로 끝나면 discard()가 이미 보낸 조각을 on_reset으로 취소합니다.
+    buffered이면 처음부터 모아 두었다가 최종 응답으로 확정될 때만 보냅니다.
+    """
+
+    def __init__(self, on_token: Callable[[str], Any], on_reset: Optional[Callable[[], Any]] = None,
+                 buffered: bool = False):
+        self.on_token = on_token
+        self.on_reset = on_reset
+        self.text = ""
+        self.sent = 0  # on_token으로 보낸 글자 수
+        self.held = buffered  # 도구 호출 표시가 나타나 이후 조각을 보류 중인지 여부
+
+    async def _emit(self, callback, *args):
+        result = callback(*args)
+        if inspect.isawaitable(result):
+            await result
+
+    async def feed(self, text: str):
+        self.text += text
+        if self.held:
+            return
+        markers = [self.text.find(marker, self.sent) for marker in TOOL_CALL_MARKERS]
+        markers = [index for index in markers if index >= 0]
+        if markers:
+            self.held = True
+            end = min(markers)
+        else:
+            # 끝부분이 도구 호출 표시의 앞부분일 수 있으면 다음 조각까지 보류합니다
+            end = len(self.text)
+            for marker in TOOL_CALL_MARKERS:
+                for length in range(min(len(marker) - 1, len(self.text)), 0, -1):
+                    if self.text.endswith(marker[:length]):
+                        end = min(end, len(self.text) - length)
+                        break
+        if end > self.sent:
+            chunk, self.sent = self.text[self.sent:end], end
+            await self._emit(self.on_token, chunk)
+
+    async def finish(self):
+        """응답이 최종 응답으로 확정되었으므로 보류한 나머지를 보냅니다."""
+        if self.sent < len(self.text):
+            chunk, self.sent = self.text[self.sent:], len(self.text)
+            await self._emit(self.on_token, chunk)
+
+    async def discard(self):
+        """응답이 최종 응답이 아니므로 이미 보낸 조각을 취소합니다."""
+        if self.sent and self.on_reset is not None:
+            await self._emit(self.on_reset)
+        self.sent = 0
 
-load_dotenv()  # load environment variables from .env
 
 class MCPClient:
-    def __init__(self, verbose=False):
+    def __init__(self, verbose=False, result_shaper: Optional[ResultShaper] = None,
+                 model: str = DEFAULT_MODEL, keep_alive: str = None, planner_model: str = None,
+                 native_tools: bool = False, config: Optional[ClientConfig] = None):
         # Initialize session and client objects
-        self.session: Optional[ClientSession] = None
+        self.session: Optional["ClientSession"] = None
         self.exit_stack = AsyncExitStack()
-        self.ollama_client = ollama
+        self._ollama_client = None  # 처음 사용할 때 ollama 모듈을 가져옵니다
         self.verbose = verbose
+        self.config = config  # 검증된 서버 설정 (없으면 처음 필요할 때 한 번 로드)
+        self.startup_timings: List[tuple] = []  # (단계 이름, 소요 시간) 목록
+        self.trace_writer: Optional[TraceWriter] = None  # 모델/도구 트래픽 기록기
+        self.model = model  # 최종 응답 생성용 모델
+        # 도구 선택용 모델 (설정하지 않으면 최종 응답 모델과 동일)
+        self.planner_model = planner_model or os.environ.get("MCP_PLANNER_MODEL") or model
+        self.routing_stats = {
+            "planned": 0,  # 도구 선택 모델이 처리한 쿼리 수
+            "tool_calls": 0,  # 도구 호출이 파싱된 쿼리 수
+            "no_tool": 0,  # 도구 없이 최종 응답 모델로 바로 답한 쿼리 수
+            "escalated": 0,  # 파싱 실패로 최종 응답 모델에 다시 요청한 횟수
+            "escalation_failed": 0  # 다시 요청해도 파싱되지 않은 횟수
+        }
+        self.keep_alive = keep_alive or os.environ.get("OLLAMA_KEEP_ALIVE", DEFAULT_KEEP_ALIVE)
+        self.latency_stats = {}  # 모델별 cold/warm 첫 토큰 지연 시간 기록
+        self._system_message_cache = (None, None)  # (도구 이름 목록, 시스템 메시지)
+        
+        # 네이티브 도구 호출 (Ollama tools= 매개변수) 설정
+        self.native_tools = native_tools
+        self._native_unsupported_models = set()  # 네이티브 도구 호출을 지원하지 않는 모델
+        self._tool_set_version = 0  # 서버/도구 목록이 바뀔 때마다 증가
+        self._native_tools_cache = (None, None)  # (도구 목록 버전, 변환된 도구 목록)
+        self._validators = (None, {})  # (도구 목록 버전, 도구별 매개변수 검사 함수)
+        
         self.server_tools_map = {}  # 서버별 도구 목록을 저장할 딕셔너리
         self.connected_servers = []  # 연결된 서버 목록
+
+        # 도구 결과 크기 제한 (잘린 결과를 읽는 로컬 도구는 첫 서버 연결 시 등록)
+        self.result_shaper = result_shaper or ResultShaper.from_env()
         
         print("MCPClient 초기화됨")
 
+    @property
+    def ollama_client(self):
+        if self._ollama_client is None:
+            ollama_client = _timed_import("ollama", self.startup_timings)
+            if self.trace_writer:
+                ollama_client = RecordingOllama(ollama_client, self.trace_writer)
+            self._ollama_client = ollama_client
+        return self._ollama_client
+
+    @ollama_client.setter
+    def ollama_client(self, client):
+        self._ollama_client = client
+
+    def load_config(self, path: str = DEFAULT_CONFIG_PATH) -> ClientConfig:
+        """서버 설정을 한 번만 읽고 검증합니다.
+
+        Raises:
+            ConfigError: 설정 파일이 없거나 유효하지 않은 경우
+        """
+        if self.config is None:
+            start_time = time.perf_counter()
+            self.config = load_config(path)
+            self.startup_timings.append(("config", time.perf_counter() - start_time))
+        return self.config
+
+    def print_startup_profile(self):
+        """시작 단계별 소요 시간을 출력합니다."""
+        print("> 시작 단계별 소요 시간:")
+        for phase, seconds in self.startup_timings:
+            print(f"  {phase:<50} {seconds:.3f}초")
+
+    def _register_builtin_tools(self):
+        """클라이언트 내부에서 처리하는 도구(잘린 결과 읽기)를 등록합니다."""
+        if "local" in self.server_tools_map:
+            return
+        local_session = LocalToolSession()
+        local_session.register(self.result_shaper.spill_tool(), self.result_shaper.read_spilled_result)
+        self.register_local_server("local", local_session)
+
+    def register_local_server(self, server_name: str, session: LocalToolSession):
+        """프로세스 내부 도구 세션을 서버 목록에 등록합니다."""
+        self._add_server(server_name, session, session.tools)
+
+    def _add_server(self, server_name: str, session, tools: List[Any], write=None):
+        """서버 세션과 도구 목록을 저장합니다. 기록 중이면 세션을 기록용으로 감쌉니다."""
+        # 클라이언트 내장 도구는 재생 시에도 그대로 실행되므로 기록하지 않습니다
+        if self.trace_writer and server_name != "local":
+            self.trace_writer.record("list_tools", time.time(), 0, server=server_name, tools=tools)
+            session = RecordingSession(session, server_name, self.trace_writer)
+        
+        self.server_tools_map[server_name] = {
+            "session": session,
+            "tools": tools,
+            "write": write
+        }
+        self._tool_set_version += 1
+
+    def enable_recording(self, path: str):
+        """이후의 모델 요청과 도구 호출을 path에 기록합니다. 서버 연결 전에 호출해야 합니다."""
+        self.trace_writer = TraceWriter(path)
+        if self._ollama_client is not None:
+            self._ollama_client = RecordingOllama(self._ollama_client, self.trace_writer)
+        print(f"> 트래픽 기록 중: {path}")
+
+    def load_replay(self, path: str, speed: str = "fast") -> List[str]:
+        """기록 파일로 Ollama와 MCP 서버를 대신합니다.
+
+        Args:
+            path: 기록 파일 경로
+            speed: "fast"(바로 응답) 또는 "recorded"(기록된 소요 시간만큼 대기)
+
+        Returns:
+            List[str]: 기록된 쿼리 목록
+        """
+        from mcp.types import Tool
+        
+        reader = TraceReader(path)
+        self.ollama_client = ReplayOllama(reader, speed)
+        self._register_builtin_tools()
+        for server_name, tools in reader.servers().items():
+            self._add_server(
+                server_name,
+                ReplaySession(reader, server_name, speed),
+                [Tool.model_validate(tool) for tool in tools]
+            )
+            self.connected_servers.append(server_name)
+        return reader.queries()
+
     async def connect_to_all_servers(self):
         """설정 파일에 있는 모든 서버에 연결합니다."""
-        if not os.path.exists('mcp-servers-config.json'):
-            print("오류: mcp-servers-config.json 파일이 없습니다.")
+        try:
+            config = self.load_config()
+        except ConfigError as e:
+            print(f"오류: {str(e)}")
             return False
             
         try:
-            with open('mcp-servers-config.json', 'r') as f:
-                config = json.load(f)
-            
-            if 'mcpServers' not in config or not config['mcpServers']:
-                print("오류: 서버 설정이 없습니다.")
-                return False
-                
             print("사용 가능한 서버 목록:")
-            for server_name in config['mcpServers']:
+            for server_name in config.servers:
                 print(f"- {server_name}")
                 
-            for server_name, server_config in config['mcpServers'].items():
+            for server_name in config.servers:
                 await self.connect_to_server(server_name)
                 
             return True
@@ -68,35 +260,33 @@ class MCPClient:
         # 서버 연결 시작 표시
         display_name = server_name if server_name else os.path.basename(server_script_path).split('.')[0]
         print(f"> {display_name} 서버에 연결 중...")
+        connect_start = time.perf_counter()
+        
+        mcp = _timed_import("mcp", self.startup_timings)
+        stdio_client = _timed_import("mcp.client.stdio", self.startup_timings).stdio_client
+        self._register_builtin_tools()
+        
+        # 설정 오류는 재시도하지 않고 프로세스를 띄우기 전에 바로 알립니다
+        server_config = None
+        if server_name:
+            if self.verbose:
+                print("서버 설정을 로드하는 중...")
+            config = self.load_config()
+            if server_name not in config.servers:
+                raise ConfigError(f"서버 {server_name}를 설정에서 찾을 수 없습니다")
+            server_config = config.servers[server_name]
+            
+            if server_config.native:
+                return self._connect_native_server(server_name, connect_start)
         
         retries = 0
         while retries < max_retries:
             try:
-                if server_name:
-                    # 서버 설정 로드
-                    if self.verbose:
-                        print("서버 설정을 로드하는 중...")
-                    with open('mcp-servers-config.json', 'r') as f:
-                        config = json.load(f)
-                    
-                    if server_name not in config['mcpServers']:
-                        raise ValueError(f"서버 {server_name}를 설정에서 찾을 수 없습니다")
-                    
-                    server_config = config['mcpServers'][server_name]
-                    
-                    # npx 명령어를 위한 환경 변수 설정
-                    env = server_config.get('env', {})
-                    if server_config['command'] == 'npx':
-                        env = {
-                            **env,
-                            'NPM_CONFIG_YES': 'true',  # npm 설치 시 자동으로 yes
-                            'NPX_FORCE': 'true'  # 패키지가 없을 경우 자동 설치
-                        }
-                    
-                    server_params = StdioServerParameters(
-                        command=server_config['command'],
-                        args=server_config['args'],
-                        env=env
+                if server_config:
+                    server_params = mcp.StdioServerParameters(
+                        command=server_config.command,
+                        args=server_config.args,
+                        env=server_config.process_env()
                     )
                     if self.verbose:
                         print(f"서버 파라미터: {server_params}")
@@ -108,7 +298,7 @@ class MCPClient:
                         raise ValueError("서버 스크립트는 .py 또는 .js 파일이어야 합니다")
 
                     command = "python" if is_python else "node"
-                    server_params = StdioServerParameters(
+                    server_params = mcp.StdioServerParameters(
                         command=command,
                         args=[server_script_path],
                         env=None
@@ -125,7 +315,7 @@ class MCPClient:
                 
                 if self.verbose:
                     print("클라이언트 세션 생성 중...")
-                session = await self.exit_stack.enter_async_context(ClientSession(stdio, write))
+                session = await self.exit_stack.enter_async_context(mcp.ClientSession(stdio, write))
                 
                 if self.verbose:
                     print("세션 초기화 중...")
@@ -137,14 +327,11 @@ class MCPClient:
                 tools = response.tools
                 
                 # 서버 및 도구 정보 저장
-                self.server_tools_map[server_name] = {
-                    "session": session,
-                    "tools": tools,
-                    "write": write
-                }
+                self._add_server(server_name, session, tools, write)
                 
                 self.connected_servers.append(server_name)
                 
+                self.startup_timings.append((f"connect {server_name}", time.perf_counter() - connect_start))
                 print(f"> {server_name} 서버 연결 성공 ✓")
                 print(f"  사용 가능한 도구: {', '.join([tool.name for tool in tools])}")
                 return True
@@ -164,6 +351,22 @@ class MCPClient:
         
         return False
 
+    def _connect_native_server(self, server_name: str, connect_start: float) -> bool:
+        """서브프로세스 없이 프로세스 내부 구현으로 서버를 등록합니다."""
+        from sequential_thinking_engine import SequentialThinkingEngine
+        
+        native_factories = {
+            "sequential-thinking": lambda: SequentialThinkingEngine(log_thoughts=self.verbose).create_session()
+        }
+        session = native_factories[server_name]()
+        self.register_local_server(server_name, session)
+        self.connected_servers.append(server_name)
+        
+        self.startup_timings.append((f"connect {server_name} (native)", time.perf_counter() - connect_start))
+        print(f"> {server_name} 서버 연결 성공 ✓ (프로세스 내부 구현)")
+        print(f"  사용 가능한 도구: {', '.join([tool.name for tool in session.tools])}")
+        return True
+
     async def find_tool_server(self, tool_name: str) -> tuple:
         """지정된 도구를 제공하는 서버 세션을 찾습니다"""
         for server_name, server_info in self.server_tools_map.items():
@@ -172,30 +375,286 @@ class MCPClient:
                     return server_info["session"], server_name
         return None, None
 
-    async def process_query(self, query: str, system_message: str = None, model: str = "MFDoom/deepseek-r1-tool-calling:14b", temperature: float = 0.7) -> Dict[str, Any]:
-        """사용자 쿼리를 처리하고 도구 호출을 실행합니다.
-
-        Args:
-            query: 사용자 쿼리
-            system_message: 시스템 메시지 (선택사항)
-            model: 사용할 모델 이름
-            temperature: 모델 temperature 값
+    async def warmup_model(self, model: str = None) -> float:
+        """모델을 미리 메모리에 로드합니다. 서버 연결과 동시에 실행할 수 있습니다.
 
         Returns:
-            Dict: 처리 결과
+            float: 로드에 걸린 시간 (초), 실패 시 -1
         """
-        if not self.connected_servers:
-            raise RuntimeError("연결된 서버가 없습니다. connect_to_server()를 먼저 호출하세요.")
+        model = model or self.model
+        print(f"> {model} 모델 로드 중...")
+        start_time = time.time()
+        try:
+            # 빈 프롬프트 요청은 응답을 생성하지 않고 모델만 로드합니다
+            # (ollama 모듈도 작업 스레드에서 가져와 서버 연결과 겹치게 합니다)
+            with startup_traffic():
+                await asyncio.to_thread(
+                    lambda: self.ollama_client.generate(
+                        model=model,
+                        prompt="",
+                        keep_alive=self.keep_alive
+                    )
+                )
+        except Exception as e:
+            print(f"> {model} 모델 로드 실패: {str(e)}")
+            return -1
+        
+        load_time = time.time() - start_time
+        self.startup_timings.append((f"warmup {model} (서버 연결과 동시 실행)", load_time))
+        print(f"> {model} 모델 로드 완료 ({load_time:.2f}초, keep_alive={self.keep_alive})")
+        return load_time
+
+    async def prime_prompt_prefix(self, model: str = None):
+        """도구 목록이 담긴 시스템 메시지를 미리 평가해 이후 쿼리가 KV 캐시를 재사용하게 합니다."""
+        model = model or self.model
+        tools = None
+        if self._use_native_tools(model):
+            messages = [{"role": "system", "content": NATIVE_TOOLS_SYSTEM_MESSAGE}]
+            tools = self._native_tool_specs()
+        else:
+            messages = [{"role": "system", "content": self._build_system_message(self._all_tools())}]
+        start_time = time.time()
+        try:
+            with startup_traffic():
+                await asyncio.to_thread(
+                    self.ollama_client.chat,
+                    model=model,
+                    messages=messages,
+                    tools=tools,
+                    stream=False,
+                    keep_alive=self.keep_alive,
+                    options={"num_predict": 1}
+                )
+        except Exception as e:
+            print(f"> 시스템 프롬프트 사전 평가 실패: {str(e)}")
+            return
+        
+        if self.verbose:
+            print(f"시스템 프롬프트 사전 평가 완료 ({time.time() - start_time:.2f}초)")
+
+    async def _chat(self, model: str, messages: List[Dict[str, Any]], temperature: float,
+                    tools: List[Dict[str, Any]] = None, on_token: Optional[Callable[[str], Any]] = None):
+        """모델에 요청을 보내고 첫 토큰 지연 시간을 cold/warm으로 나눠 기록합니다.
+
+        on_token이 주어지면 응답을 스트리밍으로 받아 조각마다 on_token(text)을 호출합니다.
+        """
+        if on_token is None:
+            response = await asyncio.to_thread(
+                self.ollama_client.chat,
+                model=model,
+                messages=messages,
+                tools=tools,
+                stream=False,
+                keep_alive=self.keep_alive,
+                options={"temperature": temperature}
+            )
+        else:
+            response = await self._chat_stream(model, messages, temperature, tools, on_token)
+        
+        # 로드 + 프롬프트 평가 시간이 첫 토큰까지의 지연입니다 (ns 단위)
+        load_time = (response.get("load_duration") or 0) / 1e9
+        first_token = load_time + (response.get("prompt_eval_duration") or 0) / 1e9
+        kind = "cold" if load_time > COLD_LOAD_THRESHOLD else "warm"
+        self.latency_stats.setdefault(model, {"cold": [], "warm": []})[kind].append(first_token)
+        
+        if self.verbose:
+            print(f"첫 토큰 지연: {first_token:.2f}초 ({kind}, 로드 {load_time:.2f}초, "
+                  f"프롬프트 토큰 {response.get('prompt_eval_count') or 0}개 평가)")
+        return response
+
+    async def _chat_stream(self, model: str, messages: List[Dict[str, Any]], temperature: float,
+                           tools: Optional[List[Dict[str, Any]]], on_token: Callable[[str], Any]) -> Dict[str, Any]:
+        """스트리밍 응답을 작업 스레드에서 받아 이벤트 루프로 넘기고, 전체 응답으로 합쳐 반환합니다.
 
-        # 모든 서버의 도구 목록 통합
+        on_token이 실패하거나 취소되면 작업 스레드가 스트림을 닫고 끝날 때까지 기다린 뒤 반환하므로
+        호출한 쪽의 동시 실행 제한이 실제 Ollama 요청 수와 일치합니다.
+        """
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        
+        def put(item):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(chunks.put_nowait, item)
+        
+        def produce():
+            stream = None
+            try:
+                stream = self.ollama_client.chat(
+                    model=model,
+                    messages=messages,
+                    tools=tools,
+                    stream=True,
+                    keep_alive=self.keep_alive,
+                    options={"temperature": temperature}
+                )
+                for chunk in stream:
+                    if stop.is_set():
+                        break
+                    put(chunk)
+            except Exception as e:
+                put(e)
+                return
+            finally:
+                # 스트림을 닫으면 HTTP 연결이 끊겨 Ollama가 생성을 멈춥니다
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+            put(None)
+        
+        producer = loop.run_in_executor(None, produce)
+        content = []
+        tool_calls = []
+        last_chunk = {}
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                message = chunk["message"]
+                tool_calls.extend(message.get("tool_calls") or [])
+                text = message["content"]
+                if text:
+                    content.append(text)
+                    result = on_token(text)
+                    if inspect.isawaitable(result):
+                        await result
+                last_chunk = chunk
+        finally:
+            stop.set()
+            with suppress(Exception):
+                await producer
+        
+        # 마지막 조각에 소요 시간 정보가 담겨 있습니다
+        response_message = {"role": "assistant", "content": "".join(content)}
+        if tool_calls:
+            response_message["tool_calls"] = tool_calls
+        return {
+            "message": response_message,
+            "load_duration": last_chunk.get("load_duration"),
+            "prompt_eval_duration": last_chunk.get("prompt_eval_duration"),
+            "prompt_eval_count": last_chunk.get("prompt_eval_count")
+        }
+
+    def print_latency_report(self):
+        """모델별 cold/warm 첫 토큰 지연 시간을 출력합니다."""
+        for model, stats in self.latency_stats.items():
+            print(f"> {model} 첫 토큰 지연:")
+            for kind in ("cold", "warm"):
+                samples = stats[kind]
+                if samples:
+                    print(f"  {kind}: 평균 {sum(samples) / len(samples):.2f}초 ({len(samples)}회)")
+
+    def _all_tools(self) -> List[Any]:
+        """모든 서버의 도구 목록을 통합합니다."""
         all_tools = []
         for server_info in self.server_tools_map.values():
             all_tools.extend(server_info["tools"])
+        return all_tools
+
+    def _validate_tool_arguments(self, tool_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """도구의 inputSchema로 매개변수를 검사하고 흔한 타입 오류(문자열 숫자 등)를 변환합니다.
+
+        검사 함수는 도구별로 한 번만 컴파일되며 도구 목록이 바뀌면 다시 만들어집니다.
+
+        Raises:
+            ToolArgumentError: 필수 매개변수 누락 또는 타입 불일치
+        """
+        version, validators = self._validators
+        if version != self._tool_set_version:
+            validators = {}
+            self._validators = (self._tool_set_version, validators)
+        
+        validator = validators.get(tool_name)
+        if validator is None:
+            tool = next((tool for tool in self._all_tools() if tool.name == tool_name), None)
+            if tool is None:
+                # 없는 도구는 execute_tool에서 오류로 처리됩니다
+                return parameters
+            validator = validators[tool_name] = compile_validator(tool_name, tool.inputSchema)
+        
+        return validator(parameters)
+
+    def _use_native_tools(self, model: str) -> bool:
+        return self.native_tools and model not in self._native_unsupported_models
+
+    def _native_tool_specs(self) -> List[Dict[str, Any]]:
+        """MCP 도구의 inputSchema를 Ollama tools= 형식으로 변환합니다. 도구 목록이 바뀔 때만 다시 만듭니다."""
+        cached_version, specs = self._native_tools_cache
+        if cached_version == self._tool_set_version:
+            return specs
+
+        specs = [
+            {
+                "type": "function",
+                "function": {
+                    "name": tool.name,
+                    "description": tool.description or "",
+                    "parameters": tool.inputSchema or {"type": "object", "properties": {}}
+                }
+            }
+            for tool in self._all_tools()
+        ]
+        self._native_tools_cache = (self._tool_set_version, specs)
+        return specs
+
+    async def _request_tool_calls(self, model: str, query: str, system_message: Optional[str],
+                                  temperature: float, history: Optional[List[Dict[str, Any]]] = None,
+                                  on_token: Optional[Callable[[str], Any]] = None) -> tuple:
+        """도구 선택 요청을 보내고 (응답 텍스트, 도구 호출 목록, 요청 메시지, 네이티브 사용 여부)를 반환합니다.
+
+        네이티브 도구 호출을 지원하지 않는 모델은 프롬프트에 도구 설명을 넣고 응답을 파싱하는 방식으로 처리합니다.
+        """
+        if self._use_native_tools(model):
+            messages = [
+                {"role": "system", "content": system_message or NATIVE_TOOLS_SYSTEM_MESSAGE},
+                *(history or []),
+                {"role": "user", "content": query}
+            ]
+            try:
+                response = await self._chat(model, messages, temperature, tools=self._native_tool_specs(),
+                                            on_token=on_token)
+            except _timed_import("ollama", self.startup_timings).ResponseError as e:
+                if "does not support tools" not in str(e):
+                    raise
+                self._native_unsupported_models.add(model)
+                print(f"> {model} 모델은 네이티브 도구 호출을 지원하지 않아 프롬프트 방식으로 전환합니다")
+            else:
+                message = response["message"]
+                return message.get("content") or "", _native_tool_calls(message), messages, True
 
         # 시스템 메시지 포맷팅
         if system_message is None:
-            # 도구 형식 예시 추가
-            system_message = """You are a helpful AI assistant that can use various tools to help users.
+            system_message = self._build_system_message(self._all_tools())
+        
+        if self.verbose:
+            print(f"시스템 메시지: {system_message}")
+
+        messages = [
+            {"role": "system", "content": system_message},
+            *(history or []),
+            {"role": "user", "content": query}
+        ]
+        response = await self._chat(model, messages, temperature, on_token=on_token)
+        
+        # 응답에서 text와 tool_use 파싱
+        text = response["message"]["content"]
+        return text, self._parse_tool_calls(text), messages, False
+
+    def _build_system_message(self, all_tools: List[Any]) -> str:
+        """도구 설명이 담긴 기본 시스템 메시지를 만듭니다.
+
+        도구 목록이 같으면 항상 같은 문자열을 반환해 모델 쪽 프롬프트 캐시가 재사용되게 합니다.
+        """
+        tool_names = tuple(tool.name for tool in all_tools)
+        cached_names, cached_message = self._system_message_cache
+        if cached_names == tool_names:
+            return cached_message
+
+        # 도구 형식 예시 추가
+        system_message = """You are a helpful AI assistant that can use various tools to help users.
 When using tools, use this format:
 
 [TOOL]tool_name{"parameter1": "value1", "parameter2": "value2"}[/TOOL]
@@ -207,55 +666,107 @@ Make sure to always include all required parameters for tools.
 
 Available tools:
 """
-            # 각 도구의 설명과 필수 매개변수를 명시적으로 추가
-            for tool in all_tools:
-                system_message += f"- {tool.name}: {tool.description}\n"
-                # 필수 매개변수 표시
-                required_params = tool.inputSchema.get("required", [])
-                if required_params:
-                    system_message += f"  Required parameters: {', '.join(required_params)}\n"
-                # 매개변수 설명 추가
-                if "properties" in tool.inputSchema:
-                    for param_name, param_info in tool.inputSchema["properties"].items():
-                        param_desc = param_info.get("description", "")
-                        param_type = param_info.get("type", "")
-                        system_message += f"  - {param_name} ({param_type}): {param_desc}\n"
-
-        # 모델과 대화
-        messages = [
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": query}
-        ]
+        # 각 도구의 설명과 필수 매개변수를 명시적으로 추가
+        for tool in all_tools:
+            system_message += f"- {tool.name}: {tool.description}\n"
+            # 필수 매개변수 표시
+            required_params = tool.inputSchema.get("required", [])
+            if required_params:
+                system_message += f"  Required parameters: {', '.join(required_params)}\n"
+            # 매개변수 설명 추가
+            if "properties" in tool.inputSchema:
+                for param_name, param_info in tool.inputSchema["properties"].items():
+                    param_desc = param_info.get("description", "")
+                    param_type = param_info.get("type", "")
+                    system_message += f"  - {param_name} ({param_type}): {param_desc}\n"
+
+        self._system_message_cache = (tool_names, system_message)
+        return system_message
+
+    async def process_query(self, query: str, system_message: str = None, model: str = None, temperature: float = 0.7,
+                            planner_model: str = None, history: Optional[List[Dict[str, Any]]] = None,
+                            on_token: Optional[Callable[[str], Any]] = None,
+                            on_reset: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+        """사용자 쿼리를 처리하고 도구 호출을 실행합니다.
+
+        Args:
+            query: 사용자 쿼리
+            system_message: 시스템 메시지 (선택사항)
+            model: 최종 응답에 사용할 모델 이름 (기본값: 클라이언트에 설정된 모델)
+            temperature: 모델 temperature 값
+            planner_model: 도구 선택에 사용할 모델 이름 (기본값: 클라이언트에 설정된 도구 선택 모델)
+            history: 이전 대화 메시지 목록 (user/assistant 역할, 선택사항)
+            on_token: 최종 응답을 스트리밍으로 받을 콜백 (선택사항). 마지막 on_reset 이후에 받은 조각을
+                합치면 반환되는 text와 같습니다.
+            on_reset: 스트리밍하던 응답이 도구 호출로 끝나 이미 보낸 조각을 버려야 할 때 호출되는 콜백
+
+        Returns:
+            Dict: 처리 결과
+        """
+        if not self.connected_servers:
+            raise RuntimeError("연결된 서버가 없습니다. connect_to_server()를 먼저 호출하세요.")
+
+        model = model or self.model
+        planner_model = planner_model or self.planner_model
+        
+        if self.trace_writer:
+            self.trace_writer.record("query", time.time(), 0, query=query)
 
         try:
             # 모델과 대화 시작 표시
-            print(f"> {model} 모델에 쿼리 전송 중...")
+            print(f"> {planner_model} 모델에 쿼리 전송 중...")
             
             if self.verbose:
-                print(f"모델 상세: {model}, 쿼리: {query}")
-                print(f"시스템 메시지: {system_message}")
+                print(f"모델 상세: {planner_model}, 쿼리: {query}")
                 
-            response = self.ollama_client.chat(
-                model=model,
-                messages=messages,
-                stream=False,
-                options={"temperature": temperature}
+            # 도구 선택 모델이 따로 있으면 그 응답은 최종 응답이 아니므로 스트리밍하지 않습니다
+            answer_stream = _AnswerStream(on_token, on_reset) if on_token and planner_model == model else None
+            assistant_message, tool_calls, messages, native = await self._request_tool_calls(
+                planner_model, query, system_message, temperature, history,
+                on_token=answer_stream.feed if answer_stream else None
             )
             
             print(f"> 모델 응답 완료")
             
-            assistant_message = response["message"]["content"]
-            
             if self.verbose:
                 print(f"모델 응답: {assistant_message}")
             
-            # 응답에서 text와 tool_use 파싱
             text = assistant_message
-            tool_calls = self._parse_tool_calls(assistant_message)
             
             if self.verbose:
                 print(f"파싱된 도구 호출: {tool_calls}")
             
+            if planner_model != model:
+                self.routing_stats["planned"] += 1
+                escalate = self._has_unparseable_call(assistant_message, tool_calls)
+                if escalate:
+                    # 작은 모델의 도구 호출을 해석할 수 없으면 큰 모델에 다시 요청
+                    self.routing_stats["escalated"] += 1
+                    print(f"> 도구 호출을 해석할 수 없어 {model} 모델에 다시 요청 중...")
+                elif not tool_calls:
+                    # 도구가 필요 없는 쿼리는 큰 모델이 직접 답변
+                    self.routing_stats["no_tool"] += 1
+                    print(f"> {model} 모델에 최종 응답 요청 중...")
+                
+                if escalate or not tool_calls:
+                    answer_stream = _AnswerStream(on_token, on_reset) if on_token else None
+                    text, tool_calls, messages, native = await self._request_tool_calls(
+                        model, query, system_message, temperature, history,
+                        on_token=answer_stream.feed if answer_stream else None
+                    )
+                    if escalate and self._has_unparseable_call(text, tool_calls):
+                        self.routing_stats["escalation_failed"] += 1
+                
+                if tool_calls:
+                    self.routing_stats["tool_calls"] += 1
+            
+            # 도구 호출이 없으면 방금 받은 응답이 최종 응답입니다
+            if answer_stream is not None:
+                if tool_calls:
+                    await answer_stream.discard()
+                else:
+                    await answer_stream.finish()
+            
             results = []
             
             # 도구 호출 개수 미리 표시
@@ -275,11 +786,18 @@ Available tools:
                         print(f"  매개변수: {parameters}")
                     
                     try:
+                        # 서버에 보내기 전에 inputSchema로 매개변수 검사 및 변환
+                        parameters = self._validate_tool_arguments(tool_name, parameters)
+                        tool_call["parameters"] = parameters
+                        
                         result = await self.execute_tool(tool_name, **parameters)
                         results.append(result)
                         
                         if self.verbose:
                             print(f"도구 실행 결과: {result}")
+                    except ToolArgumentError as e:
+                        results.append({"error": str(e), "details": e.to_dict()})
+                        print(f"> 도구 {tool_name} 매개변수 오류: {'; '.join(e.errors)}")
                     except Exception as e:
                         error_msg = f"도구 '{tool_name}' 실행 중 오류 발생: {str(e)}"
                         results.append({"error": error_msg})
@@ -292,18 +810,44 @@ Available tools:
             if tool_calls and results:
                 # 도구 호출 결과를 포함한 새로운 메시지 작성
                 follow_up_messages = messages.copy()
+                if native:
+                    follow_up_messages.append({
+                        "role": "assistant",
+                        "content": text,
+                        "tool_calls": [
+                            {"function": {"name": call["name"], "arguments": call["parameters"]}}
+                            for call in tool_calls
+                        ]
+                    })
+                
+                # 도구 결과를 텍스트로 변환하고 크기 제한 적용
+                spilled_before = self.result_shaper.stats["spilled"]
+                shaped_results = self.result_shaper.shape_turn([
+                    (tool_call["name"], result)
+                    for tool_call, result in zip(tool_calls, results)
+                    if not (isinstance(result, dict) and "error" in result)
+                ])
                 
                 # 도구 호출 결과 메시지 추가
                 for i, (tool_call, result) in enumerate(zip(tool_calls, results)):
-                    if "error" in result:
+                    if isinstance(result, dict) and "details" in result:
+                        tool_result = f"Error: {json.dumps(result['details'], ensure_ascii=False)}"
+                    elif isinstance(result, dict) and "error" in result:
                         tool_result = f"Error: {result['error']}"
                     else:
-                        tool_result = str(result)
+                        tool_result = shaped_results.pop(0)
                     
-                    follow_up_messages.append({
-                        "role": "user", 
-                        "content": f"Tool '{tool_call['name']}' result: {tool_result}"
-                    })
+                    if native:
+                        follow_up_messages.append({
+                            "role": "tool",
+                            "content": tool_result,
+                            "tool_name": tool_call["name"]
+                        })
+                    else:
+                        follow_up_messages.append({
+                            "role": "user", 
+                            "content": f"Tool '{tool_call['name']}' result: {tool_result}"
+                        })
                 
                 # 후속 응답 가져오기 - 진행 상황 표시
                 print(f"> 도구 실행 결과로 {model} 모델에 후속 응답 요청 중...")
@@ -311,12 +855,14 @@ Available tools:
                 if self.verbose:
                     print(f"후속 메시지: {follow_up_messages[-1]['content'][:100]}...")
                     
-                follow_up_response = self.ollama_client.chat(
-                    model=model,
-                    messages=follow_up_messages,
-                    stream=False,
-                    options={"temperature": temperature}
-                )
+                # 네이티브 모드에서는 잘린 결과를 이어 읽는 도구도 tools=로 호출할 수 있게 합니다
+                follow_up_tools = self._native_tool_specs() if native else None
+                # 잘린 결과가 있으면 다음 페이지를 요청하는 중간 응답이 나올 수 있으므로
+                # 최종 응답으로 확정될 때까지 스트리밍하지 않고 모아 둡니다
+                spilled = self.result_shaper.stats["spilled"] > spilled_before
+                answer_stream = _AnswerStream(on_token, on_reset, buffered=spilled) if on_token else None
+                follow_up_response = await self._chat(model, follow_up_messages, temperature, tools=follow_up_tools,
+                                                      on_token=answer_stream.feed if answer_stream else None)
                 
                 print(f"> 후속 응답 완료")
                 
@@ -325,6 +871,68 @@ Available tools:
                 if self.verbose:
                     print(f"후속 응답: {follow_up_text}")
                 
+                # 모델이 잘린 결과의 다음 부분을 요청하면 페이지 단위로 읽어 전달
+                for _ in range(MAX_SPILL_PAGES):
+                    follow_up_message = follow_up_response["message"]
+                    native_page_calls = [
+                        call for call in (_native_tool_calls(follow_up_message) if native else [])
+                        if call["name"] == SPILL_TOOL_NAME
+                    ]
+                    text_page_calls = [
+                        call for call in self._parse_tool_calls(follow_up_text)
+                        if call["name"] == SPILL_TOOL_NAME
+                    ]
+                    if not native_page_calls and not text_page_calls:
+                        break
+                    
+                    # 다음 페이지를 요청한 중간 응답은 최종 응답이 아닙니다
+                    if answer_stream is not None:
+                        await answer_stream.discard()
+                    
+                    assistant_message = {"role": "assistant", "content": follow_up_text}
+                    if native_page_calls:
+                        assistant_message["tool_calls"] = [
+                            {"function": {"name": call["name"], "arguments": call["parameters"]}}
+                            for call in native_page_calls
+                        ]
+                    follow_up_messages.append(assistant_message)
+                    # 한 번에 여러 페이지를 요청해도 턴 전체 상한을 넘지 않도록 페이지 크기를 나눠 정합니다
+                    page_calls = native_page_calls + text_page_calls
+                    page_budget = min(self.result_shaper.max_tool_bytes,
+                                      self.result_shaper.max_turn_bytes // len(page_calls))
+                    page_texts = []
+                    for page_call in page_calls:
+                        try:
+                            page_parameters = self._validate_tool_arguments(SPILL_TOOL_NAME, page_call["parameters"])
+                            requested = page_parameters.get("length") or page_budget
+                            page_parameters["length"] = min(int(requested), page_budget)
+                            page = await self.execute_tool(SPILL_TOOL_NAME, **page_parameters)
+                            page_texts.append(extract_text(page))
+                        except Exception as e:
+                            page_texts.append(f"Error: {str(e)}")
+                    page_results = self.result_shaper.shape_turn([(SPILL_TOOL_NAME, text) for text in page_texts])
+                    
+                    for index, page_result in enumerate(page_results):
+                        if index < len(native_page_calls):
+                            follow_up_messages.append({
+                                "role": "tool",
+                                "content": page_result,
+                                "tool_name": SPILL_TOOL_NAME
+                            })
+                        else:
+                            follow_up_messages.append({
+                                "role": "user",
+                                "content": f"Tool '{SPILL_TOOL_NAME}' result: {page_result}"
+                            })
+                    
+                    answer_stream = _AnswerStream(on_token, on_reset, buffered=True) if on_token else None
+                    follow_up_response = await self._chat(model, follow_up_messages, temperature, tools=follow_up_tools,
+                                                          on_token=answer_stream.feed if answer_stream else None)
+                    follow_up_text = follow_up_response["message"]["content"]
+                
+                if answer_stream is not None:
+                    await answer_stream.finish()
+                
                 # 최종 텍스트를 후속 응답으로 업데이트
                 text = follow_up_text
 
@@ -339,6 +947,23 @@ Available tools:
             print(f"> 오류: 쿼리 처리 중 문제 발생")
             raise RuntimeError(f"쿼리 처리 중 오류 발생: {str(e)}")
 
+    def _has_unparseable_call(self, message: str, tool_calls: List[Dict[str, Any]]) -> bool:
+        """도구 호출을 시도했지만 파싱되지 않았거나 없는 도구를 호출했는지 확인합니다."""
+        if tool_calls:
+            tool_names = {tool.name for tool in self._all_tools()}
+            return any(call["name"] not in tool_names for call in tool_calls)
+        return any(marker in message for marker in TOOL_CALL_MARKERS)
+
+    def print_routing_report(self):
+        """도구 선택 모델과 최종 응답 모델 간의 라우팅 결과를 출력합니다."""
+        stats = self.routing_stats
+        if not stats["planned"]:
+            return
+        print(f"> 모델 라우팅 ({self.planner_model} → {self.model}): "
+              f"쿼리 {stats['planned']}개, 도구 호출 {stats['tool_calls']}개, "
+              f"도구 없음 {stats['no_tool']}개, 재요청 {stats['escalated']}개 "
+              f"(재요청 후 실패 {stats['escalation_failed']}개)")
+
     def _parse_tool_calls(self, message: str) -> List[Dict[str, Any]]:
         """Parse tool calls from a message.
 
@@ -545,6 +1170,9 @@ Available tools:
     async def cleanup(self):
         """리소스 정리"""
         try:
+            self.result_shaper.spill_store.clear()
+            if self.trace_writer:
+                self.trace_writer.close()
             await self.exit_stack.aclose()
         except Exception as e:
             print(f"정리 중 오류 발생: {str(e)}")
@@ -581,39 +1209,141 @@ Available tools:
             print(f"> {tool_name} 실패: {str(e)}")
             raise
 
-async def main():
-    import sys
+def _native_tool_calls(message) -> List[Dict[str, Any]]:
+    """Ollama 응답 메시지의 tool_calls를 {"name", "parameters"} 목록으로 변환합니다."""
+    return [
+        {"name": call["function"]["name"], "parameters": dict(call["function"]["arguments"] or {})}
+        for call in (message.get("tool_calls") or [])
+    ]
+
+def _get_option(name: str, default: str = None) -> Optional[str]:
+    """명령줄에서 --name=value 형식의 옵션 값을 찾습니다."""
+    prefix = f"--{name}="
+    for arg in sys.argv[1:]:
+        if arg.startswith(prefix):
+            return arg[len(prefix):]
+    return default
+
+async def _run_replay(client: MCPClient, path: str, speed: str):
+    """기록 파일의 쿼리를 Ollama와 MCP 서버 없이 다시 실행하고 쿼리별 처리 시간을 출력합니다."""
+    queries = client.load_replay(path, speed)
+    print(f"> 기록 재생: 쿼리 {len(queries)}개 (속도: {speed})")
     
-    verbose = "--verbose" in sys.argv or "-v" in sys.argv
-    client = MCPClient(verbose=verbose)
+    total_start = time.perf_counter()
+    for query in queries:
+        start_time = time.perf_counter()
+        await client.process_query(query)
+        brief_query = query[:50] + "..." if len(query) > 50 else query
+        print(f"> 쿼리 처리 {time.perf_counter() - start_time:.3f}초: '{brief_query}'")
+    
+    print(f"> 재생 완료: 총 {time.perf_counter() - total_start:.3f}초")
+    if client.ollama_client.mismatches:
+        print(f"> 기록과 다른 모델 요청 {client.ollama_client.mismatches}개 (기록 순서대로 응답함)")
+
+def _print_usage():
+    print("사용법: python client.py <서버_스크립트_경로>")
+    print("     또는 python client.py --server=<서버_이름>")
+    print("     또는 python client.py  # 모든 설정된 서버에 연결")
+
+async def prepare_client(client: MCPClient, server_name: Optional[str] = None,
+                         server_script_path: Optional[str] = None) -> bool:
+    """서버 연결, 확장 모듈 적용, 모델 예열까지 대화 전 준비를 마칩니다.
+    
+    chat_loop와 gateway.py가 같은 준비 과정을 사용합니다.
+    
+    Returns:
+        bool: 설정된 모든 서버에 연결할 때 하나도 연결하지 못했으면 False
+    """
+    # 서버 연결과 동시에 모델을 미리 로드 (도구 선택 모델과 최종 응답 모델)
+    models = list(dict.fromkeys([client.planner_model, client.model]))
+    warmup_task = asyncio.gather(*(client.warmup_model(m) for m in models))
     
     try:
         # 서버 연결 로직 확인
-        if len(sys.argv) > 1 and not sys.argv[1].startswith("-"):
-            if sys.argv[1].startswith("--server="):
-                server_name = sys.argv[1].split("=")[1]
-                await client.connect_to_server(server_name=server_name)
-            else:
-                await client.connect_to_server(server_script_path=sys.argv[1])
-        else:
+        if server_name:
+            await client.connect_to_server(server_name=server_name)
+        elif server_script_path:
+            await client.connect_to_server(server_script_path=server_script_path)
+        elif not await client.connect_to_all_servers():
             # 설정 파일에서 모든 서버에 연결
-            success = await client.connect_to_all_servers()
-            if not success:
-                print("사용법: python client.py <서버_스크립트_경로>")
-                print("     또는 python client.py --server=<서버_이름>")
-                print("     또는 python client.py  # 모든 설정된 서버에 연결")
-                sys.exit(1)
-        
-        # 확장 모듈 적용
+            return False
+        
+        # 확장 모듈 적용 (해당 서버가 연결된 경우에만 모듈을 가져옵니다)
         if "sequential-thinking" in client.connected_servers:
             # Sequential Thinking 확장 적용
+            from sequential_thinking_extension import SequentialThinkingExtension
             st_extension = SequentialThinkingExtension(client)
             await st_extension.patch_client()
             
         # Perplexity Ask 확장 적용
         if "perplexity-ask" in client.connected_servers:
+            from perplexity_extension import PerplexityExtension
             px_extension = PerplexityExtension(client)
             await px_extension.patch_client()
+        
+        # 모델 로드가 끝나면 시스템 프롬프트를 미리 평가
+        for model, load_time in zip(models, await warmup_task):
+            if load_time >= 0:
+                await client.prime_prompt_prefix(model)
+        return True
+    finally:
+        if not warmup_task.done():
+            warmup_task.cancel()
+            # 취소된 예열 작업을 기다려 "exception was never retrieved" 경고를 막습니다
+            with suppress(asyncio.CancelledError):
+                await warmup_task
+
+async def main():
+    import sys
+    
+    startup_start = time.perf_counter()
+    startup_timings = []
+    _timed_import("dotenv", startup_timings).load_dotenv()  # load environment variables from .env
+    
+    verbose = "--verbose" in sys.argv or "-v" in sys.argv
+    profile_startup = "--profile-startup" in sys.argv
+    client = MCPClient(
+        verbose=verbose,
+        model=_get_option("model", DEFAULT_MODEL),
+        keep_alive=_get_option("keep-alive"),
+        planner_model=_get_option("planner-model"),
+        native_tools="--native-tools" in sys.argv
+    )
+    client.startup_timings[:0] = startup_timings
+    
+    # 기록 재생 모드: Ollama와 서버 없이 기록된 트래픽으로 실행
+    replay_path = _get_option("replay")
+    if replay_path:
+        try:
+            await _run_replay(client, replay_path, _get_option("replay-speed", "fast"))
+        finally:
+            await client.cleanup()
+        return
+    
+    record_path = _get_option("record")
+    if record_path:
+        client.enable_recording(record_path)
+    
+    server_name = _get_option("server")
+    server_script_path = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].startswith("-") else None
+    
+    # 서버 프로세스를 띄우기 전에 설정 파일을 한 번 읽고 검증
+    if server_script_path is None:
+        try:
+            client.load_config()
+        except ConfigError as e:
+            print(f"오류: {str(e)}")
+            _print_usage()
+            sys.exit(1)
+    
+    try:
+        if not await prepare_client(client, server_name=server_name, server_script_path=server_script_path):
+            _print_usage()
+            sys.exit(1)
+        
+        client.startup_timings.append(("total", time.perf_counter() - startup_start))
+        if profile_startup:
+            client.print_startup_profile()
                 
         await client.chat_loop()
     except KeyboardInterrupt:
@@ -621,6 +1351,8 @@ async def main():
     except Exception as e:
         print(f"\n오류 발생: {str(e)}")
     finally:
+        client.print_latency_report()
+        client.print_routing_report()
         await client.cleanup()
 
 if __name__ == "__main__":
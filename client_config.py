@@ -0,0 +1,90 @@
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+DEFAULT_CONFIG_PATH = "mcp-servers-config.json"
+
+# "native": true 로 설정하면 서브프로세스 대신 프로세스 내부 구현을 쓰는 서버
+NATIVE_SERVER_NAMES = ("sequential-thinking",)
+
+
+class ConfigError(ValueError):
+    """서버 설정 파일이 없거나 형식이 잘못되었을 때 발생하는 오류"""
+
+
+@dataclass
+class ServerConfig:
+    """mcpServers 항목 하나의 설정"""
+    name: str
+    command: str
+    args: List[str] = field(default_factory=list)
+    env: Dict[str, str] = field(default_factory=dict)
+    native: bool = False  # 프로세스 내부 구현 사용 여부
+
+    def process_env(self) -> Dict[str, str]:
+        """서버 프로세스에 전달할 환경 변수를 반환합니다."""
+        env = dict(self.env)
+        # npx 명령어를 위한 환경 변수 설정
+        if self.command == "npx":
+            env["NPM_CONFIG_YES"] = "true"  # npm 설치 시 자동으로 yes
+            env["NPX_FORCE"] = "true"  # 패키지가 없을 경우 자동 설치
+        return env
+
+
+@dataclass
+class ClientConfig:
+    """검증이 끝난 전체 서버 설정"""
+    servers: Dict[str, ServerConfig]
+    path: str = DEFAULT_CONFIG_PATH
+
+
+def _validate_server(name: str, entry, errors: List[str]):
+    if not isinstance(entry, dict):
+        errors.append(f"{name}: 서버 설정은 객체여야 합니다")
+        return None
+
+    command = entry.get("command")
+    args = entry.get("args", [])
+    env = entry.get("env", {}) or {}
+    native = entry.get("native", False)
+
+    if not isinstance(command, str) or not command:
+        errors.append(f"{name}: 'command'는 비어 있지 않은 문자열이어야 합니다")
+    if not isinstance(args, list) or not all(isinstance(arg, str) for arg in args):
+        errors.append(f"{name}: 'args'는 문자열 목록이어야 합니다")
+    if not isinstance(env, dict) or not all(isinstance(value, str) for value in env.values()):
+        errors.append(f"{name}: 'env'는 문자열 값을 가진 객체여야 합니다")
+    if not isinstance(native, bool):
+        errors.append(f"{name}: 'native'는 true 또는 false여야 합니다")
+    elif native and name not in NATIVE_SERVER_NAMES:
+        errors.append(f"{name}: 프로세스 내부 구현이 없는 서버입니다 (지원: {', '.join(NATIVE_SERVER_NAMES)})")
+
+    return ServerConfig(name=name, command=command, args=args, env=env, native=native)
+
+
+def load_config(path: str = DEFAULT_CONFIG_PATH) -> ClientConfig:
+    """설정 파일을 한 번 읽고 검증해 ClientConfig로 반환합니다.
+
+    Raises:
+        ConfigError: 파일이 없거나, JSON 형식이 잘못되었거나, 서버 설정이 유효하지 않은 경우
+    """
+    if not os.path.exists(path):
+        raise ConfigError(f"{path} 파일이 없습니다.")
+
+    try:
+        with open(path, "r") as f:
+            raw = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ConfigError(f"{path} JSON 형식 오류: {str(e)}")
+
+    servers = raw.get("mcpServers") if isinstance(raw, dict) else None
+    if not isinstance(servers, dict) or not servers:
+        raise ConfigError("서버 설정이 없습니다.")
+
+    errors = []
+    parsed = {name: _validate_server(name, entry, errors) for name, entry in servers.items()}
+    if errors:
+        raise ConfigError("잘못된 서버 설정:\n" + "\n".join(f"  - {error}" for error in errors))
+
+    return ClientConfig(servers=parsed, path=path)
@@ -0,0 +1,191 @@
+"""File change watching for the file manager server.
+
+Uses inotify (libc via ctypes) on Linux and falls back to comparing stat
+snapshots on a timer where inotify is unavailable or a watch cannot be added.
+"""
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+from typing import Callable, Dict, Optional, Tuple
+
+DEFAULT_POLL_INTERVAL = 1.0
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def watch_directory(path: str) -> str:
+    """Return the directory to watch in order to see changes to path.
+
+    Files are watched through their parent directory so that replacing,
+    deleting and re-creating them is noticed as well.
+    """
+    return path if os.path.isdir(path) else os.path.dirname(path)
+
+
+class PollingWatcher:
+    """Reports changed paths to on_change by comparing stat snapshots every interval seconds."""
+
+    def __init__(self, on_change: Callable[[str], None], interval: float = DEFAULT_POLL_INTERVAL):
+        self.on_change = on_change
+        self.interval = interval
+        self._snapshots: Dict[str, Optional[tuple]] = {}
+        self._counts: Dict[str, int] = {}
+        self._task = asyncio.get_running_loop().create_task(self._poll())
+
+    @staticmethod
+    def _snapshot(path: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(path)
+            if not os.path.isdir(path):
+                return stat.st_ino, stat.st_size, stat.st_mtime_ns
+            # For directories, detect added/removed entries and changes to their contents
+            entries = []
+            for entry in os.scandir(path):
+                entry_stat = entry.stat(follow_symlinks=False)
+                entries.append((entry.name, entry_stat.st_ino, entry_stat.st_size, entry_stat.st_mtime_ns))
+            return stat.st_ino, tuple(sorted(entries))
+        except OSError:
+            return None
+
+    def watching(self, path: str) -> bool:
+        return path in self._counts
+
+    def watch(self, path: str):
+        if path not in self._counts:
+            self._snapshots[path] = self._snapshot(path)
+        self._counts[path] = self._counts.get(path, 0) + 1
+
+    def unwatch(self, path: str):
+        if path not in self._counts:
+            return
+        self._counts[path] -= 1
+        if not self._counts[path]:
+            del self._counts[path]
+            del self._snapshots[path]
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            for path in list(self._snapshots):
+                snapshot = self._snapshot(path)
+                if path in self._snapshots and snapshot != self._snapshots[path]:
+                    self._snapshots[path] = snapshot
+                    self.on_change(path)
+
+    def close(self):
+        self._task.cancel()
+
+
+class InotifyWatcher:
+    """Watches directories with inotify and reports changed paths to on_change.
+
+    Paths whose watch cannot be added (e.g. ENOSPC when the per-user watch
+    limit is reached, or a missing parent directory) are polled instead.
+    """
+
+    def __init__(self, on_change: Callable[[str], None], poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._directories: Dict[int, str] = {}  # wd -> directory
+        self._watches: Dict[str, Tuple[int, int]] = {}  # directory -> (wd, reference count)
+        self._fallback: Optional[PollingWatcher] = None
+        asyncio.get_running_loop().add_reader(self._fd, self._read_events)
+
+    def watch(self, path: str):
+        if self._fallback is not None and self._fallback.watching(path):
+            self._fallback.watch(path)
+            return
+        directory = watch_directory(path)
+        if directory in self._watches:
+            wd, count = self._watches[directory]
+            self._watches[directory] = (wd, count + 1)
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            if self._fallback is None:
+                self._fallback = PollingWatcher(self.on_change, self.poll_interval)
+            self._fallback.watch(path)
+            return
+        self._directories[wd] = directory
+        self._watches[directory] = (wd, 1)
+
+    def unwatch(self, path: str):
+        if self._fallback is not None and self._fallback.watching(path):
+            self._fallback.unwatch(path)
+            return
+        directory = watch_directory(path)
+        if directory not in self._watches:
+            return
+        wd, count = self._watches[directory]
+        if count > 1:
+            self._watches[directory] = (wd, count - 1)
+            return
+        del self._watches[directory]
+        self._directories.pop(wd, None)
+        self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _read_events(self):
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            position = 0
+            while position < len(data):
+                wd, mask, _, name_length = _EVENT_HEADER.unpack_from(data, position)
+                position += _EVENT_HEADER.size
+                name = data[position:position + name_length].rstrip(b"\0")
+                position += name_length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped, so treat every watched directory as changed
+                    for directory in list(self._watches):
+                        self.on_change(directory)
+                    continue
+                directory = self._directories.get(wd)
+                if directory is not None:
+                    self.on_change(os.path.join(directory, os.fsdecode(name)) if name else directory)
+
+    def close(self):
+        asyncio.get_running_loop().remove_reader(self._fd)
+        os.close(self._fd)
+        if self._fallback is not None:
+            self._fallback.close()
+
+
+def create_watcher(on_change: Callable[[str], None]):
+    """Create an inotify watcher, or a polling watcher where inotify is unavailable.
+
+    FILE_WATCH_BACKEND=poll always uses polling; FILE_WATCH_POLL_INTERVAL sets the interval in seconds.
+    """
+    interval = float(os.environ.get("FILE_WATCH_POLL_INTERVAL", DEFAULT_POLL_INTERVAL))
+    if os.environ.get("FILE_WATCH_BACKEND", "inotify") != "poll":
+        try:
+            return InotifyWatcher(on_change, interval)
+        except (AttributeError, OSError, TypeError):
+            # No inotify on this OS (AttributeError) or the instance limit was reached (OSError)
+            pass
+    return PollingWatcher(on_change, interval)
@@ -0,0 +1,377 @@
+"""여러 사용자를 위한 HTTP 게이트웨이
+
+MCPClient 하나(미리 로드된 모델, 연결된 MCP 서버 세션, Ollama 연결)를 여러 사용자가 함께 쓰도록
+process_query를 HTTP로 제공합니다. 대화 기록은 사용자(테넌트)와 대화 ID별로 따로 보관하고,
+테넌트별 동시 실행 수를 제한하면서 대기 중인 요청을 테넌트 사이에 돌아가며 실행합니다.
+
+사용법:
+    python gateway.py [<서버_스크립트_경로> | --server=<서버_이름>]
+                      [--host=127.0.0.1] [--port=8080]
+                      [--max-concurrency=4] [--tenant-concurrency=1] [--max-queued=32]
+                      [--max-history=20]
+
+엔드포인트:
+    POST   /v1/query                    {"query": "...", "conversation_id": "...", "stream": true}
+    DELETE /v1/conversations/{id}       대화 기록 삭제
+    GET    /v1/stats                    스케줄러/라우팅/지연 시간 통계
+"""
+import asyncio
+import json
+import sys
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, List, Tuple
+
+from aiohttp import web
+
+from client import DEFAULT_MODEL, MCPClient, _get_option, _print_usage, _timed_import, prepare_client
+from client_config import ConfigError
+from result_shaping import extract_text
+
+TENANT_HEADER = "X-Tenant-ID"
+DEFAULT_TENANT = "anonymous"
+DEFAULT_CONVERSATION = "default"
+
+
+class QueueFullError(Exception):
+    """테넌트의 대기열이 가득 찼을 때 발생하는 오류"""
+
+
+class TenantScheduler:
+    """전체 동시 실행 수와 테넌트별 동시 실행 수를 제한하는 공정 대기열
+
+    실행 자리가 나면 대기 중인 테넌트를 차례대로 돌면서 하나씩 실행하므로,
+    한 테넌트가 요청을 많이 보내도 다른 테넌트의 요청이 뒤로 밀리지 않습니다.
+    """
+
+    def __init__(self, max_concurrency: int = 4, tenant_concurrency: int = 1, max_queued: int = 32):
+        self.max_concurrency = max_concurrency
+        self.tenant_concurrency = tenant_concurrency
+        self.max_queued = max_queued
+        self._running = 0
+        self._waiting: Dict[str, Deque[asyncio.Future]] = {}
+        self._rotation: Deque[str] = deque()  # 대기 요청이 있는 테넌트의 순번
+        self._active: Dict[str, int] = {}
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def _tenant_stats(self, tenant: str) -> Dict[str, float]:
+        return self.stats.setdefault(tenant, {"completed": 0, "failed": 0, "rejected": 0, "wait_seconds": 0.0})
+
+    @asynccontextmanager
+    async def slot(self, tenant: str):
+        """실행 자리를 얻을 때까지 기다린 뒤 블록이 끝나면 자리를 반납합니다.
+
+        Raises:
+            QueueFullError: 테넌트의 대기 요청 수가 max_queued에 도달한 경우
+        """
+        stats = self._tenant_stats(tenant)
+        waiters = self._waiting.get(tenant)
+        if waiters is not None and len(waiters) >= self.max_queued:
+            stats["rejected"] += 1
+            raise QueueFullError(f"테넌트 '{tenant}'의 대기 요청이 {self.max_queued}개를 넘었습니다")
+
+        future = asyncio.get_running_loop().create_future()
+        if waiters is None:
+            waiters = self._waiting[tenant] = deque()
+            self._rotation.append(tenant)
+        waiters.append(future)
+        wait_start = time.perf_counter()
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 자리를 받은 직후에 취소된 경우
+                self._release(tenant)
+            else:
+                self._forget(tenant, future)
+            raise
+        stats["wait_seconds"] += time.perf_counter() - wait_start
+
+        try:
+            yield
+        except BaseException:
+            stats["failed"] += 1
+            raise
+        else:
+            stats["completed"] += 1
+        finally:
+            self._release(tenant)
+
+    def _forget(self, tenant: str, future: asyncio.Future):
+        waiters = self._waiting.get(tenant)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(future)
+        except ValueError:
+            pass
+        if not waiters:
+            del self._waiting[tenant]
+            self._rotation.remove(tenant)
+
+    def _release(self, tenant: str):
+        self._running -= 1
+        self._active[tenant] -= 1
+        if not self._active[tenant]:
+            del self._active[tenant]
+        self._dispatch()
+
+    def _dispatch(self):
+        """빈 자리가 있는 동안 실행 가능한 테넌트에 차례대로 자리를 나눠줍니다."""
+        while self._running < self.max_concurrency:
+            for _ in range(len(self._rotation)):
+                tenant = self._rotation[0]
+                self._rotation.rotate(-1)
+                if self._active.get(tenant, 0) < self.tenant_concurrency:
+                    break
+            else:
+                return
+
+            waiters = self._waiting[tenant]
+            future = waiters.popleft()
+            if not waiters:
+                del self._waiting[tenant]
+                self._rotation.remove(tenant)
+
+            self._running += 1
+            self._active[tenant] = self._active.get(tenant, 0) + 1
+            future.set_result(None)
+
+    def queued(self, tenant: str) -> int:
+        return len(self._waiting.get(tenant, ()))
+
+    def snapshot(self) -> Dict[str, Any]:
+        tenants = {}
+        for tenant, stats in self.stats.items():
+            tenants[tenant] = dict(stats, active=self._active.get(tenant, 0), queued=self.queued(tenant))
+        return {
+            "max_concurrency": self.max_concurrency,
+            "tenant_concurrency": self.tenant_concurrency,
+            "running": self._running,
+            "queued": sum(len(waiters) for waiters in self._waiting.values()),
+            "tenants": tenants
+        }
+
+
+class ConversationStore:
+    """(테넌트, 대화 ID)별 대화 기록 저장소
+
+    대화마다 최근 max_messages개 이하의 메시지를 질문/답변 쌍 단위로 남기고(0이면 기록하지 않음),
+    대화 수가 max_conversations를 넘으면 가장 오래 쓰지 않은 대화부터 지웁니다.
+    """
+
+    def __init__(self, max_messages: int = 20, max_conversations: int = 1000):
+        self.max_messages = max_messages
+        self.max_conversations = max_conversations
+        self._conversations: "OrderedDict[Tuple[str, str], List[Dict[str, str]]]" = OrderedDict()
+
+    def history(self, tenant: str, conversation_id: str) -> List[Dict[str, str]]:
+        key = (tenant, conversation_id)
+        if key not in self._conversations:
+            return []
+        self._conversations.move_to_end(key)
+        return list(self._conversations[key])
+
+    def append(self, tenant: str, conversation_id: str, query: str, answer: str):
+        key = (tenant, conversation_id)
+        # 기록이 항상 user 메시지로 시작하도록 쌍 단위로 자릅니다
+        keep = max(0, self.max_messages) // 2 * 2
+        if keep == 0:
+            self._conversations.pop(key, None)
+            return
+        messages = self._conversations.setdefault(key, [])
+        messages.extend([
+            {"role": "user", "content": query},
+            {"role": "assistant", "content": answer}
+        ])
+        if len(messages) > keep:
+            del messages[:len(messages) - keep]
+        self._conversations.move_to_end(key)
+        while len(self._conversations) > self.max_conversations:
+            self._conversations.popitem(last=False)
+
+    def reset(self, tenant: str, conversation_id: str) -> bool:
+        return self._conversations.pop((tenant, conversation_id), None) is not None
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+
+def _encode_event(event: str, **fields) -> bytes:
+    return (json.dumps(dict(event=event, **fields), ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+class Gateway:
+    """MCPClient 하나를 여러 테넌트에 제공하는 aiohttp 애플리케이션"""
+
+    def __init__(self, client: MCPClient, scheduler: TenantScheduler, conversations: ConversationStore):
+        self.client = client
+        self.scheduler = scheduler
+        self.conversations = conversations
+        self.started = time.time()
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/query", self.handle_query)
+        app.router.add_delete("/v1/conversations/{conversation_id}", self.handle_reset)
+        app.router.add_get("/v1/stats", self.handle_stats)
+        return app
+
+    @staticmethod
+    def _tenant(request: web.Request) -> str:
+        return request.headers.get(TENANT_HEADER, "").strip() or DEFAULT_TENANT
+
+    async def _run_query(self, tenant: str, conversation_id: str, query: str,
+                         on_token=None, on_reset=None) -> Dict[str, Any]:
+        history = self.conversations.history(tenant, conversation_id)
+        result = await self.client.process_query(query, history=history, on_token=on_token, on_reset=on_reset)
+        self.conversations.append(tenant, conversation_id, query, result["text"])
+        return {
+            "text": result["text"],
+            "tool_calls": result["tool_calls"],
+            "results": [
+                result_item if isinstance(result_item, dict) else extract_text(result_item)
+                for result_item in result["results"]
+            ]
+        }
+
+    async def handle_query(self, request: web.Request) -> web.StreamResponse:
+        tenant = self._tenant(request)
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            raise web.HTTPBadRequest(text="요청 본문은 JSON이어야 합니다")
+        query = body.get("query") if isinstance(body, dict) else None
+        if not isinstance(query, str) or not query.strip():
+            raise web.HTTPBadRequest(text="'query'는 비어 있지 않은 문자열이어야 합니다")
+        conversation_id = str(body.get("conversation_id") or DEFAULT_CONVERSATION)
+
+        if not body.get("stream", True):
+            start_time = time.perf_counter()
+            try:
+                async with self.scheduler.slot(tenant):
+                    result = await self._run_query(tenant, conversation_id, query)
+            except QueueFullError as e:
+                raise web.HTTPTooManyRequests(text=str(e))
+            except RuntimeError as e:
+                return web.json_response({"error": str(e)}, status=500)
+            result["elapsed"] = round(time.perf_counter() - start_time, 3)
+            return web.json_response(result, dumps=lambda value: json.dumps(value, ensure_ascii=False, default=str))
+
+        # 스트리밍: 한 줄에 JSON 이벤트 하나씩 (queued → started → token... → done | error)
+        # reset은 그때까지 보낸 token이 최종 응답이 아니었음을 뜻합니다
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson; charset=utf-8"})
+        await response.prepare(request)
+        start_time = time.perf_counter()
+
+        async def on_token(text: str):
+            await response.write(_encode_event("token", text=text))
+
+        async def on_reset():
+            await response.write(_encode_event("reset"))
+
+        try:
+            await response.write(_encode_event("queued", position=self.scheduler.queued(tenant)))
+            async with self.scheduler.slot(tenant):
+                await response.write(_encode_event("started", wait=round(time.perf_counter() - start_time, 3)))
+                result = await self._run_query(tenant, conversation_id, query, on_token=on_token, on_reset=on_reset)
+            await response.write(_encode_event("done", elapsed=round(time.perf_counter() - start_time, 3), **result))
+        except (QueueFullError, RuntimeError) as e:
+            try:
+                await response.write(_encode_event("error", error=str(e)))
+            except ConnectionError:
+                return response
+        except ConnectionError:
+            # 사용자가 연결을 끊은 경우
+            return response
+
+        await response.write_eof()
+        return response
+
+    async def handle_reset(self, request: web.Request) -> web.Response:
+        removed = self.conversations.reset(self._tenant(request), request.match_info["conversation_id"])
+        return web.json_response({"removed": removed})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        latency = {}
+        for model, stats in self.client.latency_stats.items():
+            latency[model] = {
+                kind: {"count": len(samples), "mean": round(sum(samples) / len(samples), 3) if samples else None}
+                for kind, samples in stats.items()
+            }
+        return web.json_response({
+            "uptime": round(time.time() - self.started, 1),
+            "servers": self.client.connected_servers,
+            "conversations": len(self.conversations),
+            "scheduler": self.scheduler.snapshot(),
+            "routing": self.client.routing_stats,
+            "latency": latency,
+            "result_shaping": self.client.result_shaper.stats
+        })
+
+
+def _get_int_option(name: str, default: int) -> int:
+    return int(_get_option(name, str(default)))
+
+
+async def main():
+    startup_timings = []
+    _timed_import("dotenv", startup_timings).load_dotenv()
+
+    client = MCPClient(
+        verbose="--verbose" in sys.argv or "-v" in sys.argv,
+        model=_get_option("model", DEFAULT_MODEL),
+        keep_alive=_get_option("keep-alive"),
+        planner_model=_get_option("planner-model"),
+        native_tools="--native-tools" in sys.argv
+    )
+    client.startup_timings[:0] = startup_timings
+
+    server_name = _get_option("server")
+    server_script_path = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].startswith("-") else None
+    if server_script_path is None:
+        try:
+            client.load_config()
+        except ConfigError as e:
+            print(f"오류: {str(e)}")
+            _print_usage()
+            sys.exit(1)
+
+    gateway = Gateway(
+        client,
+        TenantScheduler(
+            max_concurrency=_get_int_option("max-concurrency", 4),
+            tenant_concurrency=_get_int_option("tenant-concurrency", 1),
+            max_queued=_get_int_option("max-queued", 32)
+        ),
+        ConversationStore(max_messages=_get_int_option("max-history", 20))
+    )
+    runner = web.AppRunner(gateway.create_app())
+
+    # MCP 서버 세션은 연결한 태스크에서 닫아야 하므로 web.run_app 대신 직접 실행합니다
+    try:
+        if not await prepare_client(client, server_name=server_name, server_script_path=server_script_path):
+            _print_usage()
+            sys.exit(1)
+
+        host = _get_option("host", "127.0.0.1")
+        port = _get_int_option("port", 8080)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        print(f"> 게이트웨이 실행 중: http://{host}:{port} (연결된 서버: {', '.join(client.connected_servers)})")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        client.print_latency_report()
+        client.print_routing_report()
+        await client.cleanup()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n게이트웨이를 종료합니다.")
@@ -0,0 +1,53 @@
+import inspect
+from typing import TYPE_CHECKING, Any, Callable, Dict, List
+
+# mcp 패키지는 가져오는 데 시간이 걸리므로 실제로 도구를 호출할 때 가져옵니다
+if TYPE_CHECKING:
+    from mcp.types import CallToolResult, ListToolsResult, Tool
+
+
+class LocalToolSession:
+    """서브프로세스 없이 클라이언트 프로세스 안에서 도구를 실행하는 세션
+
+    ClientSession과 같은 call_tool/list_tools 인터페이스를 제공하므로
+    server_tools_map에 일반 서버처럼 등록해 사용할 수 있습니다.
+    """
+
+    def __init__(self):
+        self.tools: List["Tool"] = []
+        self._handlers: Dict[str, Callable[..., Any]] = {}
+
+    def register(self, tool: "Tool", handler: Callable[..., Any]):
+        """도구 정의와 처리 함수를 등록합니다."""
+        self.tools.append(tool)
+        self._handlers[tool.name] = handler
+
+    async def list_tools(self) -> "ListToolsResult":
+        from mcp.types import ListToolsResult
+        return ListToolsResult(tools=list(self.tools))
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any] = None) -> "CallToolResult":
+        """등록된 처리 함수를 호출하고 결과를 CallToolResult로 감쌉니다."""
+        from mcp.types import CallToolResult, TextContent
+
+        handler = self._handlers.get(name)
+        if handler is None:
+            return _error_result(f"Unknown tool: {name}")
+
+        try:
+            result = handler(**(arguments or {}))
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as e:
+            return _error_result(f"Error: {str(e)}")
+
+        if isinstance(result, CallToolResult):
+            return result
+        if isinstance(result, str):
+            result = [TextContent(type="text", text=result)]
+        return CallToolResult(content=result, isError=False)
+
+
+def _error_result(message: str) -> "CallToolResult":
+    from mcp.types import CallToolResult, TextContent
+    return CallToolResult(content=[TextContent(type="text", text=message)], isError=True)
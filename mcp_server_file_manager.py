@@ -1,8 +1,15 @@
+import asyncio
+import json
 import os
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import unquote, urlparse
 
 from mcp.server.fastmcp import FastMCP
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+
+from file_watch import create_watcher
 
 # Initialize FastMCP server with configuration
 mcp = FastMCP(
@@ -16,6 +23,33 @@ mcp = FastMCP(
 BASE_PATH = os.environ.get("BASE_PATH", os.getcwd())
 print(f"File Manager initialized with BASE_PATH: {BASE_PATH}")
 
+# Default and maximum number of bytes returned by one tail_file call
+TAIL_DEFAULT_BYTES = 16 * 1024
+TAIL_MAX_BYTES = 1024 * 1024
+
+# Changes within this window are sent as a single notification per resource
+NOTIFY_DELAY = 0.1
+
+
+def _resolve_path(file_name: str) -> Optional[str]:
+    """Return the absolute path for file_name, or None if it is outside of BASE_PATH."""
+    base_dir = os.path.abspath(BASE_PATH)
+    path = os.path.normpath(os.path.join(base_dir, file_name))
+    if path != base_dir and not path.startswith(base_dir + os.sep):
+        return None
+    return path
+
+
+def _complete_utf8_length(data: bytes) -> int:
+    """Length of data without a trailing incomplete UTF-8 character."""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 == 0x80:
+            continue  # continuation byte
+        needed = 1 if byte < 0x80 else 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+        return len(data) if needed <= back else len(data) - back
+    return len(data)
+
 # Get list of files and directories in a specified path
 @mcp.tool()
 async def get_local_file_list(path: str) -> str:
@@ -115,6 +149,171 @@ async def read_file_content(file_name: str) -> str:
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
+# Read only the bytes appended to a file since the previous call
+@mcp.tool()
+async def tail_file(file_name: str, offset: int = 0, inode: int = 0, max_bytes: int = TAIL_DEFAULT_BYTES) -> str:
+    """Read new data appended to a file (e.g. a log) since the last call.
+
+    Pass the offset and inode from the cursor of the previous result to get only the new bytes.
+    Start with offset 0 to read from the beginning, or a negative offset to start that many bytes
+    before the end. If the file was replaced (different inode) or truncated, reading restarts at 0.
+    """
+    try:
+        path = _resolve_path(file_name)
+        if path is None:
+            return f"Error: Cannot read '{file_name}' - outside of allowed directory"
+
+        if not os.path.isfile(path):
+            return f"Error: File '{file_name}' does not exist or is not a file"
+
+        max_bytes = max(1, min(int(max_bytes), TAIL_MAX_BYTES))
+        offset = int(offset)
+
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            notice = ""
+            if inode and int(inode) != stat.st_ino:
+                notice = "; file was replaced, reading from start"
+                offset = 0
+            elif offset > stat.st_size:
+                notice = "; file was truncated, reading from start"
+                offset = 0
+            elif offset < 0:
+                offset = max(0, stat.st_size + offset)
+
+            f.seek(offset)
+            data = f.read(max_bytes)
+            length = _complete_utf8_length(data)
+            if length == 0 and data:
+                # max_bytes is smaller than the next character; read the rest of it
+                data += f.read(3)
+                length = _complete_utf8_length(data)
+
+        # Leave a partially written character for the next call
+        data = data[:length]
+        end = offset + length
+        cursor = json.dumps({"offset": end, "inode": stat.st_ino})
+
+        if not data:
+            return f"[tail '{file_name}': no new data; cursor {cursor}{notice}]"
+
+        remaining = stat.st_size - end
+        header = f"[tail '{file_name}': bytes {offset:,}-{end:,} of {stat.st_size:,}; cursor {cursor}{notice}"
+        header += f"; {remaining:,} more bytes]" if remaining > 0 else "]"
+        return f"{header}\n{data.decode('utf-8', errors='replace')}"
+    except Exception as e:
+        return f"Error reading file: {str(e)}"
+
+
+def _resolve_uri(uri: Any) -> str:
+    """Convert a file:// resource URI to an absolute path under BASE_PATH."""
+    parsed = urlparse(str(uri))
+    if parsed.scheme != "file":
+        raise ValueError(f"Unsupported resource URI: {uri}")
+    path = _resolve_path(unquote(parsed.path))
+    if path is None:
+        raise ValueError(f"Resource '{uri}' is outside of allowed directory")
+    return path
+
+
+class ResourceSubscriptions:
+    """Tracks resources/subscribe requests and sends notifications/resources/updated on change.
+
+    Changes are detected with inotify where available, otherwise by polling (see file_watch.py).
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Dict[Any, Any]] = {}  # path -> {session: subscribed uri}
+        self._pending = set()
+        self._watcher = None
+        self._flush_task = None
+
+    def subscribe(self, session, uri):
+        path = _resolve_uri(uri)
+        if self._watcher is None:
+            self._watcher = create_watcher(self._on_change)
+        if path not in self._subscribers:
+            self._watcher.watch(path)
+            self._subscribers[path] = {}
+        self._subscribers[path][session] = uri
+
+    def unsubscribe(self, session, uri):
+        path = _resolve_uri(uri)
+        sessions = self._subscribers.get(path)
+        if sessions is None or sessions.pop(session, None) is None:
+            return
+        if not sessions:
+            del self._subscribers[path]
+            self._watcher.unwatch(path)
+
+    def _on_change(self, changed_path: str):
+        for path in self._subscribers:
+            # A subscribed directory also changes when an entry inside it changes
+            if changed_path == path or os.path.dirname(changed_path) == path:
+                self._pending.add(path)
+        if self._pending and self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush())
+
+    async def _flush(self):
+        await asyncio.sleep(NOTIFY_DELAY)
+        self._flush_task = None
+        paths, self._pending = self._pending, set()
+        for path in paths:
+            for session, uri in list(self._subscribers.get(path, {}).items()):
+                try:
+                    await session.send_resource_updated(uri)
+                except Exception:
+                    # The client went away; drop its subscription
+                    self.unsubscribe(session, uri)
+
+
+subscriptions = ResourceSubscriptions()
+# FastMCP has no decorators for these, so register them on the low-level server
+server = mcp._mcp_server
+
+
+@server.subscribe_resource()
+async def subscribe_resource(uri) -> None:
+    subscriptions.subscribe(server.request_context.session, uri)
+
+
+@server.unsubscribe_resource()
+async def unsubscribe_resource(uri) -> None:
+    subscriptions.unsubscribe(server.request_context.session, uri)
+
+
+# Serve file:// URIs under BASE_PATH directly; other URIs go to FastMCP's resources
+@server.read_resource()
+async def read_resource(uri):
+    if urlparse(str(uri)).scheme != "file":
+        return await mcp.read_resource(uri)
+
+    path = _resolve_uri(uri)
+    if os.path.isdir(path):
+        listing = await get_local_file_list(os.path.relpath(path, os.path.abspath(BASE_PATH)))
+        return [ReadResourceContents(content=listing, mime_type="text/plain")]
+
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        return [ReadResourceContents(content=data.decode("utf-8"), mime_type="text/plain")]
+    except UnicodeDecodeError:
+        return [ReadResourceContents(content=data, mime_type="application/octet-stream")]
+
+
+# The low-level server always reports subscribe=False; advertise the handlers registered above
+_get_capabilities = server.get_capabilities
+
+
+def _get_capabilities_with_subscribe(*args, **kwargs):
+    capabilities = _get_capabilities(*args, **kwargs)
+    if capabilities.resources is not None:
+        capabilities.resources.subscribe = True
+    return capabilities
+
+
+server.get_capabilities = _get_capabilities_with_subscribe
+
 
 if __name__ == "__main__":
     # Start the MCP server with stdio transport
@@ -1,13 +1,105 @@
 import asyncio
+import hashlib
 import json
-from typing import Dict, Any
+import os
+import sqlite3
+import time
+from typing import Dict, Any, List, Optional
+
+DEFAULT_CACHE_PATH = ".perplexity_cache.sqlite3"
+DEFAULT_CACHE_TTL = 24 * 60 * 60  # 캐시 유지 시간 (초)
+DEFAULT_RATE_LIMIT = 1.0  # 초당 최대 API 요청 수
+DEFAULT_RATE_BURST = 3  # 한 번에 몰아서 보낼 수 있는 최대 요청 수
+
+
+def normalize_question(text: str) -> str:
+    """대소문자, 공백, 끝 문장부호 차이를 없앤 질문 문자열을 반환합니다."""
+    return " ".join(str(text).lower().split()).rstrip("?.!。 ")
+
+
+def cache_key(messages: List[Dict[str, Any]]) -> str:
+    """messages 목록을 정규화해 캐시 및 요청 병합에 쓰는 키를 만듭니다."""
+    normalized = [
+        [msg.get("role", ""), normalize_question(msg.get("content", ""))]
+        for msg in messages if isinstance(msg, dict)
+    ]
+    return hashlib.sha256(json.dumps(normalized, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class RateLimiter:
+    """토큰 버킷 방식으로 API 요청을 고르게 분산시키는 제한기"""
+
+    def __init__(self, rate: float = DEFAULT_RATE_LIMIT, burst: int = DEFAULT_RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """요청을 보낼 수 있을 때까지 기다립니다. 대기 순서는 도착 순서를 따릅니다."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AnswerCache:
+    """재시작 후에도 유지되는 sqlite 기반 답변 캐시"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_CACHE_TTL):
+        self.ttl = ttl
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, texts TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        # 만료된 항목 정리
+        self._db.execute("DELETE FROM answers WHERE created < ?", (time.time() - ttl,))
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        row = self._db.execute(
+            "SELECT texts FROM answers WHERE key = ? AND created >= ?", (key, time.time() - self.ttl)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, texts: List[str]):
+        self._db.execute(
+            "INSERT OR REPLACE INTO answers (key, texts, created) VALUES (?, ?, ?)",
+            (key, json.dumps(texts, ensure_ascii=False), time.time())
+        )
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
 
 class PerplexityExtension:
-    """Perplexity Ask 도구를 위한 확장 클래스"""
+    """Perplexity Ask 도구를 위한 확장 클래스
+
+    - 같은 질문이 동시에 들어오면 API 요청 하나의 결과를 함께 사용합니다.
+    - 답변은 sqlite 캐시에 TTL 동안 보관되어 재시작 후에도 재사용됩니다.
+    - 요청이 몰리면 속도 제한기로 고르게 나눠 보냅니다.
+    """
     
-    def __init__(self, client):
+    def __init__(self, client, cache: Optional[AnswerCache] = None, rate_limiter: Optional[RateLimiter] = None):
         """클라이언트 인스턴스 저장"""
         self.client = client
+        self.cache = cache or AnswerCache(
+            os.environ.get("PERPLEXITY_CACHE_PATH", DEFAULT_CACHE_PATH),
+            float(os.environ.get("PERPLEXITY_CACHE_TTL", DEFAULT_CACHE_TTL))
+        )
+        self.rate_limiter = rate_limiter or RateLimiter(
+            float(os.environ.get("PERPLEXITY_RATE_LIMIT", DEFAULT_RATE_LIMIT)),
+            int(os.environ.get("PERPLEXITY_RATE_BURST", DEFAULT_RATE_BURST))
+        )
+        self._inflight: Dict[str, asyncio.Task] = {}  # 진행 중인 요청 (캐시 키 → 업스트림 작업)
+        self.stats = {"upstream": 0, "cache_hits": 0, "coalesced": 0}
         
     async def patch_client(self):
         """클라이언트의 execute_tool 메서드를 패치하여 Perplexity 특별 처리 추가"""
@@ -59,20 +151,57 @@ class PerplexityExtension:
         if self.client.verbose:
             print(f"  메시지: {messages}")
         
-        # 도구 실행
+        key = cache_key(messages)
+        
+        # 캐시된 답변 확인
+        cached_texts = self.cache.get(key)
+        if cached_texts is not None:
+            from mcp.types import TextContent
+            self.stats["cache_hits"] += 1
+            print(f"> Perplexity-ask 캐시된 답변 사용")
+            return [TextContent(type="text", text=text) for text in cached_texts]
+        
+        # 같은 질문의 요청이 진행 중이면 그 결과를 함께 사용
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            print(f"> 진행 중인 동일한 Perplexity-ask 요청의 결과를 기다리는 중...")
+            return await asyncio.shield(inflight)
+        
+        # 업스트림 호출은 별도 작업으로 실행해, 먼저 요청한 쪽이 취소되어도 기다리는 요청에는 영향이 없게 합니다
+        task = asyncio.get_running_loop().create_task(self._fetch(session, tool_name, kwargs, key, start_time))
+        task.add_done_callback(lambda done: self._finish_inflight(key, done))
+        self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _fetch(self, session, tool_name, kwargs, key, start_time):
+        """Perplexity API를 한 번 호출하고 결과를 캐시에 저장합니다."""
         try:
+            await self.rate_limiter.acquire()
             print(f"> Perplexity API 검색 중...")
+            self.stats["upstream"] += 1
             result = await session.call_tool(tool_name, kwargs)
             content = result.content
             
+            # 텍스트로만 이루어진 정상 응답만 캐시에 저장
+            if not result.isError and all(getattr(item, "type", None) == "text" for item in content):
+                self.cache.put(key, [item.text for item in content])
+            
             # 실행 시간 계산
             end_time = asyncio.get_event_loop().time()
             execution_time = end_time - start_time
             
             print(f"> Perplexity-ask 완료 ({execution_time:.2f}초)")
-            
             return content
             
         except Exception as e:
             print(f"> Perplexity-ask 실패: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def _finish_inflight(self, key, task):
+        """끝난 요청을 진행 중 목록에서 지웁니다."""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # 기다리는 요청이 없어도 경고가 나오지 않도록 예외를 조회 처리
+            task.exception()
\ No newline at end of file
@@ -0,0 +1,356 @@
+import base64
+import hashlib
+import os
+import re
+import shutil
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from mcp.types import Tool
+
+# 기본 크기 제한 (바이트). 토큰 수는 대략 바이트 / 4 로 추정합니다.
+DEFAULT_MAX_TOOL_BYTES = 8 * 1024
+DEFAULT_MAX_TURN_BYTES = 24 * 1024
+# 저장된 잘린 결과의 보관 기간(초)과 전체 크기 상한(바이트)
+DEFAULT_SPILL_MAX_AGE = 60 * 60
+DEFAULT_SPILL_MAX_BYTES = 64 * 1024 * 1024
+BYTES_PER_TOKEN = 4
+
+SPILL_TOOL_NAME = "read_spilled_result"
+SPILL_ID_PATTERN = re.compile(r'^[0-9a-f]{16}$')
+
+
+def estimate_tokens(text: str) -> int:
+    """텍스트의 대략적인 토큰 수를 추정합니다."""
+    return len(text.encode("utf-8")) // BYTES_PER_TOKEN
+
+
+def extract_text(content: Any) -> str:
+    """MCP 도구 결과(content 목록)에서 모델에 전달할 텍스트를 추출합니다.
+
+    TextContent는 텍스트 그대로, 이미지/오디오와 바이너리 리소스는
+    크기와 형식만 담은 요약으로 변환합니다.
+    """
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if not isinstance(content, (list, tuple)):
+        content = [content]
+
+    parts = []
+    for item in content:
+        item_type = getattr(item, "type", None)
+        if item_type == "text":
+            parts.append(item.text)
+        elif item_type in ("image", "audio"):
+            size = len(base64.b64decode(item.data)) if item.data else 0
+            parts.append(f"[{item_type}: {item.mimeType}, {size:,} bytes]")
+        elif item_type == "resource":
+            resource = item.resource
+            text = getattr(resource, "text", None)
+            if text is not None:
+                parts.append(text)
+            else:
+                mime_type = getattr(resource, "mimeType", None) or "application/octet-stream"
+                parts.append(f"[resource: {resource.uri}, {mime_type}]")
+        elif item_type == "resource_link":
+            parts.append(f"[resource: {item.uri}]")
+        elif isinstance(item, str):
+            parts.append(item)
+        else:
+            parts.append(str(item))
+    return "\n".join(parts)
+
+
+def _token_cap(limit: int, max_tokens: Optional[int]) -> int:
+    """바이트 상한과 토큰 상한(바이트로 환산) 중 작은 값을 반환합니다."""
+    if max_tokens is None:
+        return limit
+    return min(limit, max_tokens * BYTES_PER_TOKEN)
+
+
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value else None
+
+
+def _complete_utf8_length(data: bytes) -> int:
+    """끝에 잘린 UTF-8 문자가 있으면 그 앞까지의 길이를 반환합니다."""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 == 0x80:
+            continue  # 이어지는 바이트
+        needed = 1 if byte < 0x80 else 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+        return len(data) if needed <= back else len(data) - back
+    return len(data)
+
+
+def _cut_bytes(data: bytes) -> str:
+    """바이트 조각을 UTF-8 문자 경계를 무시하고 안전하게 디코딩합니다."""
+    return data.decode("utf-8", errors="ignore")
+
+
+class SpillStore:
+    """크기 제한을 넘는 도구 결과를 로컬 파일에 보관하는 저장소
+
+    게이트웨이처럼 오래 실행되는 프로세스에서도 디렉토리가 끝없이 커지지 않도록, 저장할 때마다
+    max_age초 동안 읽히지 않은 결과를 지우고 전체 크기가 max_bytes를 넘으면 오래된 것부터 지웁니다.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_age: float = DEFAULT_SPILL_MAX_AGE,
+                 max_bytes: int = DEFAULT_SPILL_MAX_BYTES):
+        # 프로세스마다 별도 디렉토리를 써서 다른 클라이언트가 저장한 결과를 지우지 않습니다
+        self.directory = directory or os.path.join(".mcp_spill", str(os.getpid()))
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+
+    def _path(self, spill_id: str) -> str:
+        if not SPILL_ID_PATTERN.match(spill_id or ""):
+            raise ValueError(f"잘못된 spill_id: {spill_id}")
+        return os.path.join(self.directory, f"{spill_id}.txt")
+
+    def put(self, text: str) -> str:
+        """텍스트를 저장하고 spill_id를 반환합니다. 같은 내용은 한 번만 저장됩니다."""
+        data = text.encode("utf-8")
+        spill_id = hashlib.sha1(data).hexdigest()[:16]
+        path = self._path(spill_id)
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        self._evict(keep=path)
+        return spill_id
+
+    def _evict(self, keep: str):
+        """오래된 결과와 크기 상한을 넘는 결과를 지웁니다. 방금 저장한 keep은 남깁니다."""
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in entries:
+            if path == keep:
+                continue
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def read(self, spill_id: str, offset: int, length: int) -> Tuple[bytes, int, int]:
+        """저장된 결과의 일부를 (데이터, 시작 위치, 전체 크기) 형태로 반환합니다.
+
+        UTF-8 문자를 자르지 않도록 시작 위치는 문자 시작으로 당기고 끝은 완전한 문자까지만 읽습니다.
+        length가 문자 하나보다 작아도 최소 한 문자는 반환합니다.
+        """
+        path = self._path(spill_id)
+        if not os.path.exists(path):
+            raise ValueError(f"저장된 결과 '{spill_id}'를 찾을 수 없습니다 (오래되어 삭제되었을 수 있습니다)")
+        # 읽는 중인 결과는 최근에 쓴 것으로 보고 삭제 대상에서 뒤로 미룹니다
+        os.utime(path)
+        total = os.path.getsize(path)
+        with open(path, "rb") as f:
+            start = min(max(0, offset), total)
+            while start > 0:
+                f.seek(start)
+                byte = f.read(1)
+                if not byte or byte[0] & 0xC0 != 0x80:
+                    break
+                start -= 1
+            f.seek(start)
+            data = f.read(max(0, length))
+            complete = _complete_utf8_length(data)
+            if complete == 0 and data:
+                data += f.read(3)
+                complete = _complete_utf8_length(data)
+        return data[:complete], start, total
+
+    def size(self, spill_id: str) -> int:
+        path = self._path(spill_id)
+        if not os.path.exists(path):
+            raise ValueError(f"저장된 결과 '{spill_id}'를 찾을 수 없습니다 (오래되어 삭제되었을 수 있습니다)")
+        return os.path.getsize(path)
+
+    def clear(self):
+        """저장소 디렉토리를 삭제합니다. 상위 디렉토리는 비어 있을 때만 지웁니다."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(self.directory) or ".")
+        except OSError:
+            pass
+
+
+class ResultShaper:
+    """도구 결과가 모델로 다시 들어가기 전에 크기를 제한하는 단계
+
+    - 도구별/턴별 바이트 상한(토큰 상한이 있으면 토큰 수 x 4 바이트와 비교해 작은 값)을 적용하고,
+      넘치면 앞/뒤 부분만 남깁니다. 잘림 안내문도 상한 안에 포함됩니다.
+    - 잘린 원본은 SpillStore에 저장하고 read_spilled_result 도구로 이어서 읽게 합니다.
+    """
+
+    def __init__(self, max_tool_bytes: int = DEFAULT_MAX_TOOL_BYTES,
+                 max_turn_bytes: int = DEFAULT_MAX_TURN_BYTES,
+                 tool_limits: Optional[Dict[str, int]] = None,
+                 spill_store: Optional[SpillStore] = None,
+                 max_tool_tokens: Optional[int] = None,
+                 max_turn_tokens: Optional[int] = None):
+        self.max_tool_bytes = _token_cap(max_tool_bytes, max_tool_tokens)
+        self.max_turn_bytes = _token_cap(max_turn_bytes, max_turn_tokens)
+        self.tool_limits = {
+            name: _token_cap(limit, max_tool_tokens) for name, limit in (tool_limits or {}).items()
+        }
+        self.spill_store = spill_store or SpillStore()
+        self.stats = {"results": 0, "truncated": 0, "spilled": 0, "bytes_in": 0, "bytes_out": 0, "tokens_out": 0}
+
+    @classmethod
+    def from_env(cls) -> "ResultShaper":
+        """환경 변수에서 크기 제한을 읽어 생성합니다.
+
+        MCP_MAX_TOOL_RESULT_BYTES, MCP_MAX_TURN_RESULT_BYTES,
+        MCP_MAX_TOOL_RESULT_TOKENS, MCP_MAX_TURN_RESULT_TOKENS (선택),
+        MCP_TOOL_RESULT_LIMITS ("read_file_content=16384,everything=4096" 형식),
+        MCP_SPILL_MAX_AGE (초), MCP_SPILL_MAX_BYTES
+        """
+        tool_limits = {}
+        for item in os.environ.get("MCP_TOOL_RESULT_LIMITS", "").split(","):
+            if "=" in item:
+                name, limit = item.split("=", 1)
+                tool_limits[name.strip()] = int(limit)
+        return cls(
+            max_tool_bytes=int(os.environ.get("MCP_MAX_TOOL_RESULT_BYTES", DEFAULT_MAX_TOOL_BYTES)),
+            max_turn_bytes=int(os.environ.get("MCP_MAX_TURN_RESULT_BYTES", DEFAULT_MAX_TURN_BYTES)),
+            tool_limits=tool_limits,
+            max_tool_tokens=_optional_int(os.environ.get("MCP_MAX_TOOL_RESULT_TOKENS")),
+            max_turn_tokens=_optional_int(os.environ.get("MCP_MAX_TURN_RESULT_TOKENS")),
+            spill_store=SpillStore(
+                max_age=float(os.environ.get("MCP_SPILL_MAX_AGE", DEFAULT_SPILL_MAX_AGE)),
+                max_bytes=int(os.environ.get("MCP_SPILL_MAX_BYTES", DEFAULT_SPILL_MAX_BYTES)),
+            ),
+        )
+
+    def limit_for(self, tool_name: str) -> int:
+        return self.tool_limits.get(tool_name, self.max_tool_bytes)
+
+    def shape_turn(self, items: List[Tuple[str, Any]]) -> List[str]:
+        """한 턴의 도구 결과 목록을 텍스트로 변환하고 턴 전체 상한을 나눠 적용합니다.
+
+        Args:
+            items: (도구 이름, 도구 결과 content) 목록
+
+        Returns:
+            List[str]: 모델에 전달할 결과 텍스트 목록
+        """
+        texts = [extract_text(content) for _, content in items]
+        sizes = [len(text.encode("utf-8")) for text in texts]
+
+        # 작은 결과부터 예산을 배정해 남는 몫을 큰 결과에 넘겨줍니다
+        budgets = [0] * len(items)
+        remaining = self.max_turn_bytes
+        order = sorted(range(len(items)), key=lambda i: sizes[i])
+        for position, i in enumerate(order):
+            fair_share = remaining // (len(order) - position)
+            budgets[i] = min(sizes[i], self.limit_for(items[i][0]), fair_share)
+            remaining -= budgets[i]
+
+        return [self.shape(items[i][0], texts[i], budgets[i]) for i in range(len(items))]
+
+    def shape(self, tool_name: str, text: str, limit: Optional[int] = None) -> str:
+        """텍스트 하나를 상한에 맞게 앞/뒤만 남기고 잘라냅니다. 결과는 안내문을 포함해 limit 바이트 이하입니다."""
+        if limit is None:
+            limit = self.limit_for(tool_name)
+        data = text.encode("utf-8")
+        self.stats["results"] += 1
+        self.stats["bytes_in"] += len(data)
+
+        if len(data) <= limit:
+            return self._count_out(text)
+
+        self.stats["truncated"] += 1
+        # 이미 페이지 단위로 읽은 결과는 다시 저장하지 않습니다
+        if tool_name == SPILL_TOOL_NAME:
+            notice = f"\n... [{len(data):,} bytes total, truncated] ..."
+            kept = limit - len(notice.encode("utf-8"))
+            if kept <= 0:
+                return self._count_out(_cut_bytes(data[:limit]))
+            return self._count_out(_cut_bytes(data[:kept]) + notice)
+
+        spill_id = self.spill_store.put(text)
+        self.stats["spilled"] += 1
+
+        # 안내문의 숫자 길이가 남길 크기에 따라 달라지므로 안내문까지 상한에 들어갈 때까지 남길 크기를 줄입니다
+        kept = limit
+        while True:
+            # 이어 읽기 위치가 문자 중간이 되지 않도록 앞부분은 완전한 문자에서 끊습니다
+            head_size = _complete_utf8_length(data[:kept * 2 // 3])
+            tail_size = kept - head_size
+            notice = (
+                f"\n... [{len(data) - kept:,} of {len(data):,} bytes omitted. Full result saved as '{spill_id}'. "
+                f"Read more with [TOOL]{SPILL_TOOL_NAME}"
+                f'{{"spill_id": "{spill_id}", "offset": {head_size}}}[/TOOL]] ...\n'
+            )
+            available = limit - len(notice.encode("utf-8"))
+            if available <= 0:
+                # 안내문조차 들어가지 않는 작은 상한은 앞부분만 남깁니다
+                return self._count_out(_cut_bytes(data[:limit]))
+            if kept <= available:
+                break
+            kept = available
+
+        return self._count_out(_cut_bytes(data[:head_size]) + notice + _cut_bytes(data[len(data) - tail_size:]))
+
+    def _count_out(self, text: str) -> str:
+        self.stats["bytes_out"] += len(text.encode("utf-8"))
+        self.stats["tokens_out"] += estimate_tokens(text)
+        return text
+
+    def spill_tool(self) -> "Tool":
+        """저장된 결과를 페이지 단위로 읽는 도구 정의"""
+        from mcp.types import Tool
+        return Tool(
+            name=SPILL_TOOL_NAME,
+            description="Read a chunk of a large tool result that was truncated and saved locally.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "spill_id": {"type": "string", "description": "ID of the saved result"},
+                    "offset": {"type": "integer", "description": "Byte offset to start reading from"},
+                    "length": {"type": "integer", "description": "Number of bytes to read"},
+                },
+                "required": ["spill_id"],
+            },
+        )
+
+    def read_spilled_result(self, spill_id: str, offset: int = 0, length: int = None) -> str:
+        """read_spilled_result 도구의 처리 함수
+
+        머리말까지 포함해 length(최대 max_tool_bytes) 바이트 이하의 페이지를 반환하고,
+        머리말에는 실제로 전달한 마지막 위치를 다음 offset으로 알려줍니다.
+        """
+        offset = max(0, int(offset))
+        limit = min(int(length), self.max_tool_bytes) if length else self.max_tool_bytes
+        total = self.spill_store.size(spill_id)
+        # 머리말 길이는 숫자 자릿수에 따라 달라지므로 가장 긴 경우를 빼고 본문 크기를 정합니다
+        header_size = max(
+            len(self._page_header(spill_id, offset, total, total, next_offset=total).encode("utf-8")),
+            len(self._page_header(spill_id, offset, total, total).encode("utf-8")),
+        )
+        data, start, total = self.spill_store.read(spill_id, offset, max(1, limit - header_size))
+        end = start + len(data)
+        header = self._page_header(spill_id, start, end, total, next_offset=end if end < total else None)
+        return header + data.decode("utf-8", errors="replace")
+
+    @staticmethod
+    def _page_header(spill_id: str, start: int, end: int, total: int, next_offset: Optional[int] = None) -> str:
+        header = f"[{spill_id}: bytes {start:,}-{end:,} of {total:,}"
+        header += f"; next offset {next_offset}]" if next_offset is not None else "; end of result]"
+        return header + "\n"
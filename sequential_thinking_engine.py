@@ -0,0 +1,133 @@
+import json
+import sys
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional
+
+from local_tools import LocalToolSession
+
+if TYPE_CHECKING:
+    from mcp.types import CallToolResult, Tool
+
+TOOL_NAME = "sequentialthinking"
+
+TOOL_DESCRIPTION = """A detailed tool for dynamic and reflective problem-solving through thoughts.
+Each thought can build on, question, or revise previous insights as understanding deepens.
+You can adjust totalThoughts up or down as you progress, mark a thought as a revision of an earlier one,
+or branch from an earlier thought to explore an alternative path.
+Set nextThoughtNeeded to false only when you are done and have a satisfactory answer."""
+
+INPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "thought": {"type": "string", "description": "Your current thinking step"},
+        "nextThoughtNeeded": {"type": "boolean", "description": "Whether another thought step is needed"},
+        "thoughtNumber": {"type": "integer", "description": "Current thought number", "minimum": 1},
+        "totalThoughts": {"type": "integer", "description": "Estimated total thoughts needed", "minimum": 1},
+        "isRevision": {"type": "boolean", "description": "Whether this revises previous thinking"},
+        "revisesThought": {"type": "integer", "description": "Which thought is being reconsidered", "minimum": 1},
+        "branchFromThought": {"type": "integer", "description": "Branching point thought number", "minimum": 1},
+        "branchId": {"type": "string", "description": "Branch identifier"},
+        "needsMoreThoughts": {"type": "boolean", "description": "If more thoughts are needed"},
+    },
+    "required": ["thought", "nextThoughtNeeded", "thoughtNumber", "totalThoughts"],
+}
+
+
+class Thought(NamedTuple):
+    """기록된 생각 하나 (튜플 기반이라 항목당 메모리가 작습니다)"""
+    thought: str
+    thought_number: int
+    total_thoughts: int
+    next_thought_needed: bool
+    is_revision: bool = False
+    revises_thought: Optional[int] = None
+    branch_from_thought: Optional[int] = None
+    branch_id: Optional[str] = None
+    needs_more_thoughts: bool = False
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class SequentialThinkingEngine:
+    """@modelcontextprotocol/server-sequential-thinking 서버와 같은 동작을 하는 프로세스 내부 구현
+
+    stdio로 Node 서버를 거치지 않고 생각 기록을 바로 처리해 단계마다의 JSON-RPC 왕복을 없앱니다.
+    """
+
+    def __init__(self, log_thoughts: bool = False):
+        self.history: List[Thought] = []
+        self.branches: Dict[str, List[int]] = {}  # 분기 ID → history 인덱스 목록
+        self.log_thoughts = log_thoughts
+
+    def _validate(self, arguments: Dict[str, Any]) -> Thought:
+        thought = arguments.get("thought")
+        if not thought or not isinstance(thought, str):
+            raise ValueError("Invalid thought: must be a string")
+        for name in ("thoughtNumber", "totalThoughts"):
+            if not arguments.get(name) or not _is_number(arguments[name]):
+                raise ValueError(f"Invalid {name}: must be a number")
+        if not isinstance(arguments.get("nextThoughtNeeded"), bool):
+            raise ValueError("Invalid nextThoughtNeeded: must be a boolean")
+
+        return Thought(
+            thought=thought,
+            thought_number=arguments["thoughtNumber"],
+            total_thoughts=arguments["totalThoughts"],
+            next_thought_needed=arguments["nextThoughtNeeded"],
+            is_revision=bool(arguments.get("isRevision", False)),
+            revises_thought=arguments.get("revisesThought"),
+            branch_from_thought=arguments.get("branchFromThought"),
+            branch_id=arguments.get("branchId"),
+            needs_more_thoughts=bool(arguments.get("needsMoreThoughts", False)),
+        )
+
+    def process_thought(self, **arguments) -> "CallToolResult":
+        """생각 하나를 기록하고 서버와 같은 형식의 JSON 결과를 반환합니다."""
+        from mcp.types import CallToolResult, TextContent
+
+        try:
+            thought = self._validate(arguments)
+        except ValueError as e:
+            text = json.dumps({"error": str(e), "status": "failed"}, indent=2)
+            return CallToolResult(content=[TextContent(type="text", text=text)], isError=True)
+
+        # 예상보다 생각이 길어지면 전체 단계 수를 늘립니다
+        if thought.thought_number > thought.total_thoughts:
+            thought = thought._replace(total_thoughts=thought.thought_number)
+
+        self.history.append(thought)
+        if thought.branch_from_thought and thought.branch_id:
+            self.branches.setdefault(thought.branch_id, []).append(len(self.history) - 1)
+
+        if self.log_thoughts:
+            print(self._format_thought(thought), file=sys.stderr)
+
+        text = json.dumps({
+            "thoughtNumber": thought.thought_number,
+            "totalThoughts": thought.total_thoughts,
+            "nextThoughtNeeded": thought.next_thought_needed,
+            "branches": list(self.branches),
+            "thoughtHistoryLength": len(self.history),
+        }, indent=2)
+        return CallToolResult(content=[TextContent(type="text", text=text)], isError=False)
+
+    def _format_thought(self, thought: Thought) -> str:
+        if thought.is_revision:
+            prefix = f"Revision {thought.thought_number}/{thought.total_thoughts} (revising thought {thought.revises_thought})"
+        elif thought.branch_from_thought:
+            prefix = (f"Branch {thought.thought_number}/{thought.total_thoughts} "
+                      f"(from thought {thought.branch_from_thought}, ID: {thought.branch_id})")
+        else:
+            prefix = f"Thought {thought.thought_number}/{thought.total_thoughts}"
+        return f"{prefix}: {thought.thought}"
+
+    def tool(self) -> "Tool":
+        from mcp.types import Tool
+        return Tool(name=TOOL_NAME, description=TOOL_DESCRIPTION, inputSchema=INPUT_SCHEMA)
+
+    def create_session(self) -> LocalToolSession:
+        """이 엔진을 도구로 제공하는 프로세스 내부 세션을 만듭니다."""
+        session = LocalToolSession()
+        session.register(self.tool(), self.process_thought)
+        return session
@@ -65,7 +65,11 @@ class SequentialThinkingExtension:
             
             # 실행 결과에서 다음 사고 여부 확인
             try:
-                result_data = json.loads(content) if isinstance(content, str) else content
+                if isinstance(content, list):
+                    content_text = "".join(item.text for item in content if getattr(item, "type", None) == "text")
+                    result_data = json.loads(content_text)
+                else:
+                    result_data = json.loads(content) if isinstance(content, str) else content
                 next_thought_needed = result_data.get("nextThoughtNeeded", False)
                 
                 # 마지막 사고인지 확인
@@ -0,0 +1,150 @@
+"""PerplexityExtension 요청 병합/캐시/속도 제한 테스트
+
+실제 Perplexity 서버 대신 같은 perplexity_ask 도구를 제공하는 프로세스 내부 대역 서버를 사용합니다.
+
+실행:
+    python -m pytest -q test_perplexity_extension.py
+"""
+import asyncio
+import time
+
+import pytest
+from mcp.types import CallToolResult, TextContent, Tool
+
+from client import MCPClient
+from local_tools import LocalToolSession
+from perplexity_extension import AnswerCache, PerplexityExtension, RateLimiter
+
+QUESTION = [{"role": "user", "content": "What is MCP?"}]
+
+
+class StandInPerplexity(LocalToolSession):
+    """perplexity_ask 도구를 흉내 내는 대역 서버. 호출 수를 세고 지연/오류를 흉내 냅니다."""
+
+    def __init__(self, delay: float = 0.05, error: Exception = None):
+        super().__init__()
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.register(
+            Tool(name="perplexity_ask", description="stand-in", inputSchema={"type": "object", "properties": {}}),
+            self._answer
+        )
+
+    async def call_tool(self, name, arguments=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return await super().call_tool(name, arguments)
+
+    def _answer(self, messages):
+        return CallToolResult(content=[TextContent(type="text", text=f"answer to {messages[-1]['content']}")])
+
+
+async def _patched_client(server: StandInPerplexity, cache: AnswerCache, rate_limiter: RateLimiter = None):
+    client = MCPClient()
+    client.register_local_server("perplexity-ask", server)
+    client.connected_servers.append("perplexity-ask")
+    extension = PerplexityExtension(client, cache=cache, rate_limiter=rate_limiter or RateLimiter(rate=1000, burst=100))
+    await extension.patch_client()
+    return client, extension
+
+
+def test_concurrent_identical_questions_are_coalesced(tmp_path):
+    async def run():
+        server = StandInPerplexity(delay=0.1)
+        client, extension = await _patched_client(server, AnswerCache(str(tmp_path / "cache.sqlite3")))
+        # 대소문자/공백/물음표 차이는 같은 질문으로 봅니다
+        variants = ["What is MCP?", "what is mcp", "  What   is MCP ", "WHAT IS MCP?", "What is MCP"]
+        results = await asyncio.gather(*(
+            client.execute_tool("perplexity_ask", messages=[{"role": "user", "content": text}])
+            for text in variants
+        ))
+        return server, extension, results
+
+    server, extension, results = asyncio.run(run())
+    assert server.calls == 1
+    assert extension.stats["upstream"] == 1
+    assert extension.stats["coalesced"] == 4
+    assert {result[0].text for result in results} == {"answer to What is MCP?"}
+
+
+def test_cache_is_reused_by_a_new_cache_instance(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+
+    async def ask(server, cache):
+        client, extension = await _patched_client(server, cache)
+        result = await client.execute_tool("perplexity_ask", messages=QUESTION)
+        cache.close()
+        return extension, result
+
+    first_server = StandInPerplexity()
+    asyncio.run(ask(first_server, AnswerCache(path)))
+
+    second_server = StandInPerplexity()
+    extension, result = asyncio.run(ask(second_server, AnswerCache(path)))
+    assert first_server.calls == 1
+    assert second_server.calls == 0
+    assert extension.stats["cache_hits"] == 1
+    assert result[0].text == "answer to What is MCP?"
+
+
+def test_cached_answers_expire_after_ttl(tmp_path):
+    cache = AnswerCache(str(tmp_path / "cache.sqlite3"), ttl=0.05)
+    cache.put("key", ["text"])
+    assert cache.get("key") == ["text"]
+    time.sleep(0.1)
+    assert cache.get("key") is None
+
+
+def test_upstream_error_is_delivered_to_every_waiter_and_not_cached(tmp_path):
+    async def run():
+        server = StandInPerplexity(delay=0.1, error=ConnectionError("upstream down"))
+        client, extension = await _patched_client(server, AnswerCache(str(tmp_path / "cache.sqlite3")))
+        results = await asyncio.gather(
+            *(client.execute_tool("perplexity_ask", messages=QUESTION) for _ in range(3)),
+            return_exceptions=True
+        )
+        # 실패한 답변은 캐시되지 않아 다음 요청이 다시 서버로 갑니다
+        server.error = None
+        retry = await client.execute_tool("perplexity_ask", messages=QUESTION)
+        return server, results, retry
+
+    server, results, retry = asyncio.run(run())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert server.calls == 2
+    assert retry[0].text == "answer to What is MCP?"
+
+
+def test_cancelling_the_first_waiter_does_not_cancel_the_others(tmp_path):
+    async def run():
+        server = StandInPerplexity(delay=0.1)
+        client, extension = await _patched_client(server, AnswerCache(str(tmp_path / "cache.sqlite3")))
+        leader = asyncio.ensure_future(client.execute_tool("perplexity_ask", messages=QUESTION))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.ensure_future(client.execute_tool("perplexity_ask", messages=QUESTION)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*followers, return_exceptions=True)
+        return server, leader, results
+
+    server, leader, results = asyncio.run(run())
+    assert leader.cancelled()
+    assert server.calls == 1
+    assert [result[0].text for result in results] == ["answer to What is MCP?"] * 2
+
+
+def test_rate_limiter_spaces_requests():
+    async def run():
+        limiter = RateLimiter(rate=20, burst=1)
+        times = []
+        for _ in range(5):
+            await limiter.acquire()
+            times.append(time.monotonic())
+        return times
+
+    times = asyncio.run(run())
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert min(gaps) >= 0.05 * 0.8
+    assert times[-1] - times[0] == pytest.approx(0.2, abs=0.1)
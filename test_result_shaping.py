@@ -0,0 +1,148 @@
+"""ResultShaper 크기 제한과 잘린 결과 페이지 읽기 테스트
+
+실행:
+    python -m pytest -q test_result_shaping.py
+"""
+import asyncio
+import json
+import os
+import re
+import time
+
+import pytest
+from mcp.types import Tool
+
+from client import MCPClient
+from local_tools import LocalToolSession
+from result_shaping import SPILL_TOOL_NAME, ResultShaper, SpillStore
+
+PAGE_HEADER = re.compile(r"^\[(\w+): bytes ([\d,]+)-([\d,]+) of ([\d,]+); (?:next offset (\d+)|end of result)\]\n")
+
+
+def _original_text() -> str:
+    # 한글(3바이트)과 ASCII를 섞어 페이지 경계가 문자 중간에 걸리게 합니다
+    return "".join(f"{i:05d} 가나다라마바사 line\n" for i in range(2000))
+
+
+@pytest.fixture
+def shaper(tmp_path):
+    return ResultShaper(max_tool_bytes=1000, max_turn_bytes=2500, spill_store=SpillStore(str(tmp_path / "spill")))
+
+
+def _spill_id(shaped: str) -> str:
+    return re.search(r"saved as '(\w+)'", shaped).group(1)
+
+
+@pytest.mark.parametrize("limit", [100, 271, 1000, 4096])
+def test_shaped_result_stays_within_limit(shaper, limit):
+    shaped = shaper.shape("tool", _original_text(), limit)
+    assert len(shaped.encode("utf-8")) <= limit
+
+
+def test_walking_all_pages_returns_the_original_text(shaper):
+    original = _original_text()
+    spill_id = _spill_id(shaper.shape("tool", original))
+
+    pieces, offset = [], 0
+    while True:
+        page = shaper.read_spilled_result(spill_id, offset)
+        assert len(page.encode("utf-8")) <= shaper.max_tool_bytes
+        match = PAGE_HEADER.match(page)
+        assert int(match.group(2).replace(",", "")) == offset
+        body = page[match.end():]
+        assert len(body.encode("utf-8")) == int(match.group(3).replace(",", "")) - offset
+        pieces.append(body)
+        if match.group(5) is None:
+            break
+        offset = int(match.group(5))
+
+    assert "".join(pieces) == original
+
+
+def test_head_and_pages_continue_without_gaps(shaper):
+    original = _original_text()
+    shaped = shaper.shape("tool", original)
+    spill_id = _spill_id(shaped)
+    head, _, _ = shaped.partition("\n... [")
+    offset = int(re.search(r'"offset": (\d+)', shaped).group(1))
+    assert original.encode("utf-8")[:offset].decode("utf-8") == head
+
+    page = shaper.read_spilled_result(spill_id, offset)
+    body = page[PAGE_HEADER.match(page).end():]
+    assert original.startswith(head + body)
+
+
+def test_page_starting_inside_a_character_is_realigned(shaper):
+    original = _original_text()
+    spill_id = _spill_id(shaper.shape("tool", original))
+    # 6번째 바이트는 '가'(3바이트)의 중간입니다
+    page = shaper.read_spilled_result(spill_id, 7)
+    match = PAGE_HEADER.match(page)
+    assert int(match.group(2).replace(",", "")) == 6
+    assert page[match.end():].startswith("가나다")
+
+
+def test_spill_store_evicts_old_results(tmp_path):
+    store = SpillStore(str(tmp_path / "spill"), max_age=60)
+    old_id = store.put("old result")
+    old_path = os.path.join(store.directory, f"{old_id}.txt")
+    stale = time.time() - 120
+    os.utime(old_path, (stale, stale))
+
+    new_id = store.put("new result")
+    assert not os.path.exists(old_path)
+    assert store.read(new_id, 0, 100)[0] == b"new result"
+    with pytest.raises(ValueError):
+        store.read(old_id, 0, 100)
+
+
+def test_spill_store_keeps_total_size_under_limit(tmp_path):
+    store = SpillStore(str(tmp_path / "spill"), max_bytes=2500)
+    spill_ids = []
+    for i in range(5):
+        spill_ids.append(store.put(f"{i}" * 1000))
+        # 저장 순서가 수정 시각 순서와 같도록 앞의 결과를 조금씩 과거로 돌립니다
+        written = time.time() - 10 + i
+        os.utime(os.path.join(store.directory, f"{spill_ids[-1]}.txt"), (written, written))
+
+    remaining = sorted(os.listdir(store.directory))
+    assert remaining == sorted(f"{spill_id}.txt" for spill_id in spill_ids[-2:])
+
+
+def test_paging_turn_respects_turn_limit(shaper):
+    calls = []
+
+    class PagingOllama:
+        def chat(self, model, messages, tools=None, stream=False, keep_alive=None, options=None):
+            last = messages[-1]["content"]
+            calls.append(messages)
+            if last == "query":
+                text = '[TOOL]big{}[/TOOL]'
+            elif "saved as" in last:
+                spill_id = _spill_id(last)
+                text = "".join(
+                    f'[TOOL]{SPILL_TOOL_NAME}{json.dumps({"spill_id": spill_id, "offset": page * 1000})}[/TOOL]'
+                    for page in range(10)
+                )
+            else:
+                text = "done"
+            return {"message": {"content": text}}
+
+    async def run():
+        client = MCPClient(result_shaper=shaper)
+        client.ollama_client = PagingOllama()
+        client._register_builtin_tools()
+        session = LocalToolSession()
+        session.register(Tool(name="big", inputSchema={"type": "object", "properties": {}}), _original_text)
+        client.register_local_server("demo", session)
+        client.connected_servers.append("demo")
+        return await client.process_query("query")
+
+    result = asyncio.run(run())
+    assert result["text"] == "done"
+    page_messages = [message for message in calls[-1]
+                     if message["content"].startswith(f"Tool '{SPILL_TOOL_NAME}' result: ")]
+    assert len(page_messages) == 10
+    page_bytes = sum(len(message["content"].encode("utf-8")) for message in page_messages)
+    prefix_bytes = sum(len(f"Tool '{SPILL_TOOL_NAME}' result: ".encode("utf-8")) for _ in page_messages)
+    assert page_bytes - prefix_bytes <= shaper.max_turn_bytes
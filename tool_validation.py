@@ -0,0 +1,205 @@
+import json
+import re
+from typing import Any, Callable, Dict, List
+
+INTEGER_PATTERN = re.compile(r'^[+-]?\d+$')
+
+
+class ToolArgumentError(ValueError):
+    """도구 매개변수가 inputSchema와 맞지 않을 때 발생하는 오류"""
+
+    def __init__(self, tool_name: str, errors: List[str], schema: Dict[str, Any]):
+        self.tool_name = tool_name
+        self.errors = errors
+        self.schema = schema
+        super().__init__(f"도구 '{tool_name}' 매개변수 오류: {'; '.join(errors)}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """모델에 다시 전달할 구조화된 오류 정보"""
+        return {
+            "error": "invalid_arguments",
+            "tool": self.tool_name,
+            "details": self.errors,
+            "required": self.schema.get("required", []),
+            "properties": {
+                name: prop.get("type", "any")
+                for name, prop in self.schema.get("properties", {}).items()
+            }
+        }
+
+
+def _coerce_integer(value):
+    if isinstance(value, bool):
+        raise ValueError("expected integer")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and INTEGER_PATTERN.match(value.strip()):
+        return int(value.strip())
+    raise ValueError("expected integer")
+
+
+def _coerce_number(value):
+    if isinstance(value, bool):
+        raise ValueError("expected number")
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return _coerce_integer(value)
+        except ValueError:
+            pass
+        try:
+            return float(value.strip())
+        except ValueError:
+            pass
+    raise ValueError("expected number")
+
+
+def _coerce_boolean(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    raise ValueError("expected boolean")
+
+
+def _coerce_string(value):
+    if isinstance(value, str):
+        return value
+    # Tool: 패턴 등에서 JSON으로 파싱된 숫자는 다시 문자열로 되돌립니다
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise ValueError("expected string")
+
+
+def _coerce_json(expected_type, type_name):
+    def coerce(value):
+        # 문자열로 전달된 JSON 객체/배열을 풀어서 사용합니다
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                raise ValueError(f"expected {type_name}")
+        if not isinstance(value, expected_type):
+            raise ValueError(f"expected {type_name}")
+        return value
+    return coerce
+
+
+def _coerce_null(value):
+    if value is None:
+        return None
+    raise ValueError("expected null")
+
+
+TYPE_COERCERS = {
+    "integer": _coerce_integer,
+    "number": _coerce_number,
+    "boolean": _coerce_boolean,
+    "string": _coerce_string,
+    "object": _coerce_json(dict, "object"),
+    "array": _coerce_json(list, "array"),
+    "null": _coerce_null,
+}
+
+
+def _allows_null(schema: Dict[str, Any]) -> bool:
+    """스키마가 null 값을 허용하는지 확인합니다 (type에 "null" 포함, anyOf/oneOf 중 하나가 null 허용 등)."""
+    types = schema.get("type")
+    if types == "null" or (isinstance(types, list) and "null" in types):
+        return True
+    if schema.get("nullable") is True or None in (schema.get("enum") or []):
+        return True
+    variants = schema.get("anyOf") or schema.get("oneOf") or []
+    return any(isinstance(variant, dict) and _allows_null(variant) for variant in variants)
+
+
+def _compile_property(schema: Dict[str, Any]) -> Callable[[Any], Any]:
+    """매개변수 하나의 스키마를 값 변환/검사 함수로 컴파일합니다."""
+    # Optional[...] 매개변수는 anyOf/oneOf로 표현됩니다
+    variants = schema.get("anyOf") or schema.get("oneOf")
+    if variants:
+        checks = [_compile_property(variant) for variant in variants]
+    else:
+        types = schema.get("type")
+        if isinstance(types, str):
+            types = [types]
+        checks = [TYPE_COERCERS[t] for t in types or [] if t in TYPE_COERCERS]
+    if not checks:
+        checks = [lambda value: value]
+
+    item_check = _compile_property(schema["items"]) if isinstance(schema.get("items"), dict) else None
+    enum = schema.get("enum")
+
+    def check(value):
+        messages = []
+        for coerce in checks:
+            try:
+                value = coerce(value)
+                break
+            except ValueError as e:
+                messages.append(str(e))
+        else:
+            raise ValueError(" or ".join(messages) + f", got {type(value).__name__}")
+
+        if item_check is not None and isinstance(value, list):
+            value = [item_check(item) for item in value]
+        if enum is not None and value not in enum:
+            raise ValueError(f"must be one of {enum}")
+        return value
+
+    return check
+
+
+def compile_validator(tool_name: str, schema: Dict[str, Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """도구의 inputSchema를 검사 함수로 컴파일합니다.
+
+    반환된 함수는 매개변수를 받아 변환된 매개변수를 반환하고,
+    맞지 않으면 모든 오류를 모아 ToolArgumentError를 발생시킵니다.
+    """
+    schema = schema or {}
+    property_checks = {
+        name: _compile_property(prop)
+        for name, prop in schema.get("properties", {}).items()
+    }
+    nullable = {
+        name for name, prop in schema.get("properties", {}).items()
+        if isinstance(prop, dict) and _allows_null(prop)
+    }
+    required = schema.get("required", [])
+    allow_additional = schema.get("additionalProperties", True) is not False
+
+    def validate(arguments: Dict[str, Any]) -> Dict[str, Any]:
+        errors = []
+        validated = {}
+
+        for name in required:
+            if name not in arguments or (arguments[name] is None and name not in nullable):
+                errors.append(f"missing required parameter '{name}'")
+
+        for name, value in arguments.items():
+            check = property_checks.get(name)
+            if check is None:
+                if allow_additional:
+                    validated[name] = value
+                else:
+                    errors.append(f"unknown parameter '{name}'")
+                continue
+            if value is None:
+                # null을 허용하는 매개변수는 그대로 전달하고, 아니면 생략된 것으로 봅니다
+                # (필수 매개변수 누락은 위에서 이미 기록했습니다)
+                if name in nullable:
+                    validated[name] = None
+                continue
+            try:
+                validated[name] = check(value)
+            except ValueError as e:
+                errors.append(f"parameter '{name}': {str(e)}")
+
+        if errors:
+            raise ToolArgumentError(tool_name, errors, schema)
+        return validated
+
+    return validate
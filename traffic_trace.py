@@ -0,0 +1,287 @@
+"""모델/도구 트래픽 기록 및 재생
+
+실제 process_query 세션의 ollama.chat 요청/응답과 session.call_tool 교환을
+타임스탬프와 함께 JSON Lines 파일(.gz 확장자면 gzip 압축)로 기록하고,
+Ollama와 MCP 서버 없이 같은 트래픽으로 MCPClient를 다시 실행합니다.
+"""
+import asyncio
+import contextvars
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional
+
+TRACE_VERSION = 1
+
+# 모델 로드/시스템 프롬프트 사전 평가처럼 쿼리와 무관한 시작 준비 요청인지 여부
+_startup_traffic = contextvars.ContextVar("startup_traffic", default=False)
+
+
+@contextmanager
+def startup_traffic():
+    """블록 안의 모델 요청을 시작 준비 트래픽으로 표시합니다.
+
+    표시된 요청은 기록에 startup 항목으로 남고, 재생할 때 쿼리 응답으로 사용되지 않습니다.
+    asyncio.to_thread는 컨텍스트를 복사하므로 작업 스레드에서 보낸 요청에도 적용됩니다.
+    """
+    token = _startup_traffic.set(True)
+    try:
+        yield
+    finally:
+        _startup_traffic.reset(token)
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _to_jsonable(value: Any) -> Any:
+    """pydantic 모델(ollama/mcp 응답)을 JSON으로 저장할 수 있는 값으로 변환합니다."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, dict):
+        return {key: _to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(item) for item in value]
+    return value
+
+
+def digest(value: Any) -> str:
+    """요청 내용을 짧은 해시로 요약합니다. 재생 시 같은 요청을 찾는 데 사용합니다."""
+    data = json.dumps(_to_jsonable(value), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]
+
+
+def _model_request_digest(kwargs: Dict[str, Any]) -> str:
+    """모델 요청을 요약합니다. 스트리밍 여부와 로드/추론 옵션은 응답 내용과 무관하므로 제외합니다."""
+    return digest({key: value for key, value in kwargs.items() if key not in ("keep_alive", "options", "stream")})
+
+
+def _merge_chunks(chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """스트리밍으로 기록된 응답 조각을 스트리밍하지 않은 응답 하나로 합칩니다.
+
+    본문과 도구 호출은 모든 조각에서 모으고, 소요 시간/토큰 수 같은 통계는 마지막 조각의 값을 씁니다.
+    """
+    if not chunks:
+        return {}
+    merged = {key: value for key, value in chunks[-1].items() if key not in ("message", "response")}
+    if any("message" in chunk for chunk in chunks):
+        message = {"role": "assistant", "content": ""}
+        tool_calls = []
+        for chunk in chunks:
+            part = chunk.get("message") or {}
+            message["content"] += part.get("content") or ""
+            tool_calls.extend(part.get("tool_calls") or [])
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        merged["message"] = message
+    else:
+        merged["response"] = "".join(chunk.get("response") or "" for chunk in chunks)
+    merged["done"] = True
+    return merged
+
+
+class TraceWriter:
+    """트래픽 기록 파일 작성기"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = _open(path, "w")
+        # 작업 스레드와 이벤트 루프 스레드가 동시에 기록하므로 한 줄씩 잠가서 씁니다
+        self._lock = threading.Lock()
+        self._start = time.time()
+        self._write({"kind": "header", "version": TRACE_VERSION, "created": self._start})
+
+    def _write(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def record(self, kind: str, started: float, duration: float, **fields):
+        """기록 항목 하나를 씁니다. t는 기록 시작부터의 경과 시간, d는 소요 시간(초)입니다."""
+        entry = {"kind": kind, "t": round(started - self._start, 6), "d": round(duration, 6)}
+        entry.update({key: _to_jsonable(value) for key, value in fields.items()})
+        self._write(entry)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class RecordingOllama:
+    """ollama 모듈/클라이언트를 감싸 chat/generate 요청과 응답을 기록합니다."""
+
+    def __init__(self, inner, writer: TraceWriter):
+        self._inner = inner
+        self._writer = writer
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    def _call(self, kind: str, method, **kwargs):
+        started = time.time()
+        response = method(**kwargs)
+        request = _model_request_digest(kwargs)
+        extra = {"startup": True} if _startup_traffic.get() else {}
+        
+        if kwargs.get("stream"):
+            # 스트리밍 응답은 조각을 그대로 넘겨주면서 모아 두었다가 끝나면 기록합니다.
+            # 도중에 멈춘 스트림도 받은 조각까지 기록되도록 finally에서 씁니다.
+            def stream():
+                chunks = []
+                try:
+                    for chunk in response:
+                        chunks.append(chunk)
+                        yield chunk
+                finally:
+                    self._writer.record(kind, started, time.time() - started,
+                                        model=kwargs.get("model"), request=request, response=chunks, **extra)
+            return stream()
+        
+        self._writer.record(kind, started, time.time() - started,
+                            model=kwargs.get("model"), request=request, response=response, **extra)
+        return response
+
+    def chat(self, **kwargs):
+        return self._call("chat", self._inner.chat, **kwargs)
+
+    def generate(self, **kwargs):
+        return self._call("generate", self._inner.generate, **kwargs)
+
+
+class RecordingSession:
+    """MCP 세션을 감싸 call_tool 요청과 결과를 기록합니다."""
+
+    def __init__(self, inner, server_name: str, writer: TraceWriter):
+        self._inner = inner
+        self._server_name = server_name
+        self._writer = writer
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any] = None):
+        started = time.time()
+        result = await self._inner.call_tool(name, arguments)
+        self._writer.record(
+            "call_tool", started, time.time() - started,
+            server=self._server_name,
+            tool=name,
+            request=digest(arguments or {}),
+            result=result
+        )
+        return result
+
+
+class TraceReader:
+    """기록 파일을 읽어 재생에 필요한 형태로 분류합니다."""
+
+    def __init__(self, path: str):
+        with _open(path, "r") as f:
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        header = self.entries[0] if self.entries else {}
+        if header.get("kind") != "header" or header.get("version") != TRACE_VERSION:
+            raise ValueError(f"{path}: 지원하지 않는 기록 파일 형식입니다")
+
+    def of_kind(self, kind: str) -> List[Dict[str, Any]]:
+        return [entry for entry in self.entries if entry["kind"] == kind]
+
+    def queries(self) -> List[str]:
+        return [entry["query"] for entry in self.of_kind("query")]
+
+    def servers(self) -> Dict[str, List[Dict[str, Any]]]:
+        """서버 이름 → 기록된 도구 정의 목록"""
+        return {entry["server"]: entry["tools"] for entry in self.of_kind("list_tools")}
+
+
+class _ReplayQueue:
+    """요청 해시가 같은 기록을 먼저 사용하고, 없으면 아직 쓰지 않은 기록을 순서대로 사용합니다."""
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self._pending: Deque[Dict[str, Any]] = deque(entries)
+        self._by_request: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for entry in entries:
+            self._by_request[entry["request"]].append(entry)
+        self.mismatches = 0
+
+    def take(self, request: str) -> Optional[Dict[str, Any]]:
+        matches = self._by_request.get(request)
+        if matches:
+            entry = matches.popleft()
+            self._pending.remove(entry)
+            return entry
+        if not self._pending:
+            return None
+        # 클라이언트 코드가 바뀌어 요청이 달라진 경우 기록 순서대로 응답합니다
+        self.mismatches += 1
+        entry = self._pending.popleft()
+        self._by_request[entry["request"]].remove(entry)
+        return entry
+
+
+class ReplayOllama:
+    """기록된 chat/generate 응답을 돌려주는 Ollama 대역
+
+    speed가 "recorded"이면 기록된 소요 시간만큼 기다리고, "fast"이면 바로 응답합니다.
+    """
+
+    def __init__(self, reader: TraceReader, speed: str = "fast"):
+        self.speed = speed
+        # 시작 준비 요청은 재생하지 않으므로 응답 후보에서 제외합니다
+        self._queues = {
+            kind: _ReplayQueue([entry for entry in reader.of_kind(kind) if not entry.get("startup")])
+            for kind in ("chat", "generate")
+        }
+
+    def _replay(self, kind: str, **kwargs):
+        request = _model_request_digest(kwargs)
+        entry = self._queues[kind].take(request)
+        if entry is None:
+            raise RuntimeError(f"기록에 남은 {kind} 응답이 없습니다")
+        if self.speed == "recorded":
+            time.sleep(entry["d"])  # chat은 작업 스레드에서 호출되므로 이벤트 루프를 막지 않습니다
+        if kwargs.get("stream"):
+            response = entry["response"]
+            # 스트리밍으로 기록되지 않은 응답은 조각 하나로 돌려줍니다
+            return iter(response if isinstance(response, list) else [response])
+        response = entry["response"]
+        # 스트리밍으로 기록된 응답은 조각을 합쳐 돌려줍니다
+        return _merge_chunks(response) if isinstance(response, list) else response
+
+    def chat(self, **kwargs):
+        return self._replay("chat", **kwargs)
+
+    def generate(self, **kwargs):
+        return self._replay("generate", **kwargs)
+
+    @property
+    def mismatches(self) -> int:
+        return sum(queue.mismatches for queue in self._queues.values())
+
+
+class ReplaySession:
+    """기록된 call_tool 결과를 돌려주는 MCP 세션 대역"""
+
+    def __init__(self, reader: TraceReader, server_name: str, speed: str = "fast"):
+        self.speed = speed
+        self._queues: Dict[str, _ReplayQueue] = {}
+        calls = [entry for entry in reader.of_kind("call_tool") if entry["server"] == server_name]
+        for tool_name in {entry["tool"] for entry in calls}:
+            self._queues[tool_name] = _ReplayQueue([entry for entry in calls if entry["tool"] == tool_name])
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any] = None):
+        from mcp.types import CallToolResult
+
+        queue = self._queues.get(name)
+        entry = queue.take(digest(arguments or {})) if queue else None
+        if entry is None:
+            raise RuntimeError(f"기록에 남은 '{name}' 도구 결과가 없습니다")
+        if self.speed == "recorded":
+            await asyncio.sleep(entry["d"])
+        return CallToolResult.model_validate(entry["result"])